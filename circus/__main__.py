@@ -2,7 +2,8 @@
 
 import sys
 from flask import Flask, request, abort
-from circus import rest
+from circus import rest, seraf
+from circus.util import config_paths
 
 GPL_NOTICE = f"""
 Circus Copyright (C) 2021 Electronics & Drives
@@ -29,16 +30,16 @@ def carnival():
 
     args   = rest.parser.parse_args()
 
-    env_id, pdk, space, var, num, steps, host, port, scale, states, goals = \
+    env_id, pdk, space, var, num, steps, host, port, scale, states, goals, cache, info = \
             [ getattr(args, a) for a in
               [ 'env', 'pdk', 'space', 'var', 'num', 'step'
-              , 'host', 'port', 'scale', 'states', 'goals' ] ]
+              , 'host', 'port', 'scale', 'states', 'goals', 'cache', 'info' ] ]
 
     goals  = goals  or None
     states = states or 'perf'
 
     circ   = rest.make_env( env_id, pdk, space, var, num
-                          , steps, scale, states, goals )
+                          , steps, scale, states, goals, cache, info )
 
     route  = f'{env_id}-{pdk}-{space}-v{var}'
 
@@ -144,6 +145,21 @@ def carnival():
     print(f'\tURL: http://{host}:{port}/{route}/')
     return app.run(host = host, port = port)
 
+def worker():
+    """
+    Evaluation worker daemon for the 'remote' simulation backend.
+    """
+    args = seraf.parser.parse_args()
+
+    ckt_cfg, pdk_cfg, netlist = config_paths( args.env, args.pdk, args.ckt_cfg
+                                            , args.pdk_cfg, args.netlist )
+
+    print(f'Launching Circus Worker with {args.num} {args.env}-{args.pdk} sessions.')
+    print(f'\tAddress: {args.host}:{args.port}')
+    return seraf.serve( (args.host, args.port), ckt_cfg, pdk_cfg, netlist
+                      , args.num, recycle_after = args.recycle_after
+                      , max_rss = args.max_rss )
+
 def main():
     """
     Do nothing, print GPL Notice.
@@ -0,0 +1,585 @@
+""" Simulation Result Caches """
+
+import os
+import json
+import time
+import queue
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Optional, Hashable, Tuple, Iterable, Union
+
+import numpy as np
+import pandas as pd
+
+from .seraf import BasePool, OpSpec, project, mirror
+
+def sizing_key( prefix: Tuple, sizing: pd.DataFrame, digits: int = 6
+              ) -> Tuple:
+    """
+    Hashable key for a single row `sizing`, quantized to `digits` significant
+    digits, s.t. sizings that only differ by floating point noise share a key.
+    """
+    row = sizing.iloc[0]
+    return prefix + tuple( (k, float(f'{v:.{digits}g}'))
+                           for k,v in sorted(row.items()) )
+
+class ResultCache:
+    """
+    Bounded in-memory LRU cache of simulation results. Evicts the least
+    recently used results once there are more than `size` entries or they
+    take up more than `memory` bytes.
+    """
+    def __init__(self, size: int = None, memory: int = None):
+        """
+        Construct a result cache.
+        Arguments:
+            - `size`:   Maximum number of cached results.
+            - `memory`: Maximum memory of cached results in bytes.
+        """
+        self.size    = size
+        self.memory  = memory
+        self.entries = OrderedDict()
+        self.nbytes  = 0
+        self.hits    = 0
+        self.misses  = 0
+        self.lock    = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def get(self, key: Hashable) -> Optional[pd.DataFrame]:
+        """
+        Cached result for `key` or `None`, counts as hit or miss.
+        """
+        with self.lock:
+            if key not in self.entries:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.entries.move_to_end(key)
+            result,_ = self.entries[key]
+        return result.copy()
+
+    def put(self, key: Hashable, result: pd.DataFrame) -> None:
+        """
+        Cache `result` for `key` and evict old results if necessary.
+        """
+        nbytes = int(result.memory_usage(deep = True).sum())
+        with self.lock:
+            if key in self.entries:
+                self.nbytes -= self.entries.pop(key)[1]
+            self.entries[key] = (result.copy(), nbytes)
+            self.nbytes      += nbytes
+            while self.entries and \
+                    ( (self.size   is not None and len(self.entries) > self.size) or
+                      (self.memory is not None and self.nbytes > self.memory) ):
+                self.nbytes -= self.entries.popitem(last = False)[1][1]
+
+    def stats(self) -> dict[str, int]:
+        """
+        Cache hits and misses, number of entries and their memory in bytes.
+        """
+        with self.lock:
+            return { 'cache_hits':    self.hits
+                   , 'cache_misses':  self.misses
+                   , 'cache_entries': len(self.entries)
+                   , 'cache_bytes':   self.nbytes }
+
+def file_hash(path: str) -> str:
+    """
+    SHA-256 of the contents of the file at `path`, empty if it doesn't exist.
+    """
+    if not path or not os.path.isfile(path):
+        return ''
+    with open(path, 'rb') as file:
+        return hashlib.sha256(file.read()).hexdigest()
+
+def spec_path( ckt_id: str, pdk_id: str, ckt_cfg: str, pdk_cfg: str
+             , netlist: str ) -> str:
+    """
+    Path to the cached spec of a circuit in `$CIRCUS_HOME/spec`, keyed by the
+    contents of its configuration and netlist.
+    """
+    home = os.environ.get('CIRCUS_HOME', os.path.expanduser('~/.circus'))
+    key  = hashlib.sha256(''.join(map(file_hash, [ckt_cfg, pdk_cfg, netlist])).encode())
+    return f'{home}/spec/{ckt_id}-{pdk_id}-{key.hexdigest()[:16]}.json'
+
+def load_spec(path: str) -> Optional[Tuple[OpSpec, pd.DataFrame]]:
+    """
+    Load a spec stored with `store_spec`, `None` if there is none.
+    """
+    try:
+        with open(path, 'r') as file:
+            cached = json.load(file)
+        return ( OpSpec(**cached['spec'])
+               , pd.DataFrame({ k: [v] for k,v in cached['result'].items() }) )
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+
+def store_spec(path: str, spec: OpSpec, result: pd.DataFrame) -> None:
+    """
+    Store the `spec` of a circuit and the `result` of evaluating its initial
+    sizing at `path`, atomically. Nothing is stored if `path` isn't writable.
+    """
+    cached = { 'spec':   spec._asdict()
+             , 'result': { k: float(v) for k,v in result.iloc[0].items() } }
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok = True)
+        with open(f'{path}.{os.getpid()}', 'w') as file:
+            json.dump(cached, file, default = float)
+        os.replace(f'{path}.{os.getpid()}', path)
+    except OSError:
+        pass
+
+class SQLiteCache:
+    """
+    Persistent simulation result store in an SQLite database, which may be
+    shared by concurrent processes and outlives training runs. Evicts the
+    least recently used results once the stored results take up more than
+    `size` bytes, down to `headroom * size` bytes, s.t. eviction runs rarely.
+    The stored size is tracked in a running total, seeded from the database
+    and recounted before evicting. Writes are queued and done by a background
+    thread, in as few transactions as possible, s.t. callers never wait for
+    the disk, see `flush`. Same interface as `ResultCache`.
+    """
+    def __init__(self, path: str, size: int = None, headroom: float = 0.9):
+        """
+        Open or create a result store.
+        Arguments:
+            - `path`:     Path to the database file.
+            - `size`:     Maximum size of stored results in bytes.
+            - `headroom`: Fraction of `size` evictions free space down to.
+        """
+        self.path     = os.path.expanduser(path)
+        self.size     = size
+        self.headroom = headroom
+        self.hits     = 0
+        self.misses   = 0
+        self.lock     = threading.Lock()
+        self.local    = threading.local()
+        self.pending  = {}
+        self.writes   = queue.Queue()
+        self.writer   = threading.Thread(target = self._write, daemon = True)
+
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok = True)
+        with self.connection() as db:
+            db.execute( 'CREATE TABLE IF NOT EXISTS results '
+                        '( key TEXT PRIMARY KEY, columns TEXT, result BLOB'
+                        ', size INTEGER, accessed REAL )' )
+            db.execute( 'CREATE INDEX IF NOT EXISTS results_accessed '
+                        'ON results (accessed)' )
+        self.nbytes   = self._total()
+        self.writer.start()
+
+    def connection(self) -> sqlite3.Connection:
+        """
+        Connection to the database for the calling thread.
+        """
+        if getattr(self.local, 'db', None) is None:
+            self.local.db = sqlite3.connect(self.path, timeout = 60.0)
+            self.local.db.execute('PRAGMA journal_mode = WAL')
+            self.local.db.execute('PRAGMA synchronous = NORMAL')
+        return self.local.db
+
+    def __len__(self) -> int:
+        return self.connection().execute('SELECT COUNT(*) FROM results').fetchone()[0]
+
+    @staticmethod
+    def encode(key: Hashable) -> str:
+        return hashlib.sha256(repr(key).encode()).hexdigest()
+
+    def _total(self) -> int:
+        return self.connection().execute( 'SELECT COALESCE(SUM(size), 0) '
+                                          'FROM results' ).fetchone()[0]
+
+    def get(self, key: Hashable) -> Optional[pd.DataFrame]:
+        """
+        Stored result for `key` or `None`, counts as hit or miss.
+        """
+        code = self.encode(key)
+        with self.lock:
+            row = self.pending.get(code)
+        if row is None:
+            row = self.connection().execute( 'SELECT key, columns, result FROM results '
+                                             'WHERE key = ?', (code,) ).fetchone()
+        with self.lock:
+            self.hits   += row is not None
+            self.misses += row is None
+        if row is None:
+            return None
+        self.writes.put(('touch', [ (time.time(), code) ]))
+        columns = json.loads(row[1])
+        values  = np.frombuffer(row[2], dtype = np.float64).reshape(-1, len(columns))
+        return pd.DataFrame(values.copy(), columns = columns)
+
+    def put(self, key: Hashable, result: pd.DataFrame) -> None:
+        """
+        Store `result` for `key` and evict old results if necessary.
+        """
+        self.put_many([key], [result])
+
+    def put_many( self, keys: Iterable[Hashable]
+                , results: Iterable[pd.DataFrame] ) -> None:
+        """
+        Store many results at once, e.g. for seeding the store with results
+        of earlier runs.
+        """
+        now  = time.time()
+        rows = {}
+        for key,result in zip(keys, results):
+            code       = self.encode(key)
+            values     = result.to_numpy(dtype = np.float64)
+            rows[code] = ( code, json.dumps(result.columns.tolist())
+                         , values.tobytes(), values.size * 8, now )
+        with self.lock:
+            self.pending.update(rows)
+        self.writes.put(('store', list(rows.values())))
+
+    def flush(self) -> None:
+        """
+        Wait until all queued writes are done.
+        """
+        self.writes.join()
+
+    def _write(self) -> None:
+        while True:
+            batch = [ self.writes.get() ]
+            while not self.writes.empty():
+                batch.append(self.writes.get_nowait())
+            rows    = { r[0]: r for kind,rs in batch if kind == 'store' for r in rs }
+            touches = [ t for kind,ts in batch if kind == 'touch' for t in ts ]
+            try:
+                self._store(list(rows.values()), touches)
+            except sqlite3.Error:
+                pass
+            finally:
+                with self.lock:
+                    for code,row in rows.items():
+                        if self.pending.get(code) is row:
+                            del self.pending[code]
+                for _ in batch:
+                    self.writes.task_done()
+
+    def _store(self, rows: list[tuple], touches: list[tuple]) -> None:
+        db       = self.connection()
+        codes    = [ r[0] for r in rows ]
+        replaced = sum( db.execute( 'SELECT COALESCE(SUM(size), 0) FROM results '
+                                    f'WHERE key IN ({",".join("?" * len(chunk))})'
+                                  , chunk ).fetchone()[0]
+                        for chunk in ( codes[i:i+500]
+                                       for i in range(0, len(codes), 500) ) )
+        with db:
+            db.executemany( 'INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?)'
+                          , rows )
+            db.executemany('UPDATE results SET accessed = ? WHERE key = ?', touches)
+        with self.lock:
+            self.nbytes += sum(r[3] for r in rows) - replaced
+            evict        = self.size is not None and self.nbytes > self.size
+        if evict:
+            self._evict(db)
+
+    def _evict(self, db: sqlite3.Connection) -> None:
+        total  = self._total()
+        excess = total - int(self.headroom * self.size) if total > self.size else 0
+        freed  = 0
+        keys   = []
+        oldest = db.execute('SELECT key, size FROM results ORDER BY accessed, key DESC')
+        for key,size in oldest:
+            if freed >= excess:
+                break
+            keys.append((key,))
+            freed += size
+        oldest.close()
+        with db:
+            db.executemany('DELETE FROM results WHERE key = ?', keys)
+        with self.lock:
+            self.nbytes = total - freed
+
+    def merge(self, path: str) -> int:
+        """
+        Import all results of another result store at `path`, that are not
+        stored yet. Returns the number of imported results.
+        """
+        db     = self.connection()
+        before = len(self)
+        db.execute('ATTACH DATABASE ? AS other', (os.path.expanduser(path),))
+        try:
+            with db:
+                db.execute('INSERT OR IGNORE INTO results SELECT * FROM other.results')
+        finally:
+            db.execute('DETACH DATABASE other')
+        with self.lock:
+            self.nbytes = self._total()
+        return len(self) - before
+
+    def stats(self) -> dict[str, int]:
+        """
+        Store hits and misses of this process, number of stored results and
+        their size in bytes.
+        """
+        entries = self.connection().execute('SELECT COUNT(*) FROM results').fetchone()[0]
+        with self.lock:
+            return { 'disk_hits':    self.hits
+                   , 'disk_misses':  self.misses
+                   , 'disk_entries': entries
+                   , 'disk_bytes':   self.nbytes }
+
+class TieredCache:
+    """
+    Chain of result caches, e.g. a `ResultCache` in front of a `SQLiteCache`.
+    Results found in a later cache are put into all earlier ones. Same
+    interface as `ResultCache`.
+    """
+    def __init__(self, *caches):
+        self.caches = caches
+
+    def __len__(self) -> int:
+        return len(self.caches[-1])
+
+    def get(self, key: Hashable) -> Optional[pd.DataFrame]:
+        for i,cache in enumerate(self.caches):
+            result = cache.get(key)
+            if result is not None:
+                _  = [ c.put(key, result) for c in self.caches[:i] ]
+                return result
+        return None
+
+    def put(self, key: Hashable, result: pd.DataFrame) -> None:
+        for cache in self.caches:
+            cache.put(key, result)
+
+    def flush(self) -> None:
+        for cache in self.caches:
+            _ = cache.flush() if hasattr(cache, 'flush') else None
+
+    def stats(self) -> dict[str, int]:
+        return { k: v for c in self.caches for k,v in c.stats().items() }
+
+def import_results( cache: Union[ResultCache, SQLiteCache], prefix: Tuple
+                  , sizing: pd.DataFrame, results: pd.DataFrame
+                  , digits: int = 6 ) -> None:
+    """
+    Seed `cache` with results of earlier runs. Row `i` of `results` belongs
+    to row `i` of `sizing`, `prefix` must be the same as for the `CachedPool`
+    using the cache.
+    """
+    keys    = [ sizing_key(prefix, sizing.iloc[[i]], digits)
+                for i in range(len(sizing)) ]
+    results = [ results.iloc[[i]].reset_index(drop = True)
+                for i in range(len(results)) ]
+    if hasattr(cache, 'put_many'):
+        cache.put_many(keys, results)
+        cache.flush()
+    else:
+        _ = [ cache.put(k, r) for k,r in zip(keys, results) ]
+
+class NeighbourIndex:
+    """
+    Bounded index of evaluated sizings for approximate reuse of results.
+    Sizings are normalized by taking the logarithm, s.t. the distance between
+    two sizings is the largest relative deviation of any parameter. Once
+    there are `size` sizings, the oldest ones are replaced. The search is
+    vectorized brute force, which is fast enough for the bounded size and
+    supports incremental insertion.
+    """
+    def __init__(self, size: int = 10000):
+        """
+        Construct an index.
+        Arguments:
+            - `size`: Maximum number of indexed sizings.
+        """
+        self.size    = size
+        self.columns = None
+        self.points  = None
+        self.results = [ None for _ in range(size) ]
+        self.count   = 0
+        self.lock    = threading.Lock()
+
+    def __len__(self) -> int:
+        return min(self.count, self.size)
+
+    def normalize(self, sizing: pd.DataFrame) -> np.ndarray:
+        return np.log(np.abs(sizing[self.columns].to_numpy(dtype = np.float64)[0]))
+
+    def insert(self, sizing: pd.DataFrame, result: pd.DataFrame) -> None:
+        """
+        Add an evaluated `sizing` with its `result`.
+        """
+        with self.lock:
+            if self.columns is None:
+                self.columns = sorted(sizing.columns)
+                self.points  = np.full((self.size, len(self.columns)), np.inf)
+            slot               = self.count % self.size
+            self.points[slot]  = self.normalize(sizing)
+            self.results[slot] = result.copy()
+            self.count        += 1
+
+    def query( self, sizing: pd.DataFrame, tolerance: float
+             ) -> Optional[Tuple[float, pd.DataFrame]]:
+        """
+        Relative distance and result of the nearest indexed sizing, if it
+        deviates by at most `tolerance` in every parameter.
+        """
+        with self.lock:
+            if self.columns is None:
+                return None
+            distance = np.max( np.abs(self.points[:len(self)] - self.normalize(sizing))
+                             , axis = 1 )
+            nearest  = int(np.argmin(distance))
+            if distance[nearest] > np.log1p(tolerance):
+                return None
+            return (np.expm1(distance[nearest]), self.results[nearest].copy())
+
+class ApproximatePool(BasePool):
+    """
+    Wraps a session pool and answers evaluations of sizings that deviate by
+    at most `tolerance` from a sizing evaluated before with that result,
+    instead of simulating. Such futures are flagged with `approximate = True`,
+    see `approximated`. As with `CachedPool`, the sizing is still set on the
+    session. The index holds complete results, which are projected to the
+    requested columns on the way out.
+    """
+    def __init__(self, pool: BasePool, index: NeighbourIndex, tolerance: float):
+        """
+        Construct an approximating pool.
+        Arguments:
+            - `pool`:      Session pool to wrap.
+            - `index`:     Index of evaluated sizings.
+            - `tolerance`: Relative deviation of each parameter.
+        """
+        self.pool      = pool
+        self.spec      = pool.spec
+        self.index     = index
+        self.tolerance = tolerance
+        self.hits      = 0
+        self.lock      = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.pool)
+
+    def idle(self) -> list[int]:
+        return self.pool.idle()
+
+    def stats(self) -> dict[str, int]:
+        with self.lock:
+            hits = self.hits
+        return self.pool.stats() | { 'approximations': hits }
+
+    def submit(self, idx: int, cmd: str, *args) -> Future:
+        """
+        Same as `submit` of the wrapped pool, but evaluations may be
+        approximated.
+        """
+        if cmd != 'evaluate' or not args:
+            return self.pool.submit(idx, cmd, *args)
+
+        sizing  = args[0]
+        columns = args[1] if len(args) > 1 else None
+        nearest = self.index.query(sizing, self.tolerance)
+
+        if nearest is not None:
+            distance, result   = nearest
+            with self.lock:
+                self.hits     += 1
+            _                  = self.pool.submit(idx, 'set_parameters', sizing.iloc[0].to_dict())
+            future             = Future()
+            future.approximate = distance > 0.0
+            future.set_result(project(result, columns))
+            return future
+
+        def insert(attempt: Future) -> None:
+            if attempt.exception() is None and \
+                    not getattr(attempt, 'sim_timeout', False):
+                self.index.insert(sizing, attempt.result())
+
+        # The mirror resolves after `insert`, s.t. the result is indexed once
+        # the caller sees it.
+        future = self.pool.submit(idx, cmd, sizing)
+        future.add_done_callback(insert)
+        return mirror(future, columns)
+
+    def close(self) -> None:
+        """
+        Close the wrapped pool.
+        """
+        self.pool.close()
+
+def approximated(futures: Iterable[Future]) -> list[bool]:
+    """
+    Which of the evaluation `futures` were answered with the result of a
+    nearby sizing, see `ApproximatePool`.
+    """
+    return [ getattr(f, 'approximate', False) for f in futures ]
+
+class CachedPool(BasePool):
+    """
+    Wraps a session pool and answers evaluations of sizings that were seen
+    before from `cache`. On a hit the sizing is still set on the session, s.t.
+    it is in the same state as after a simulation. Results of simulations
+    that timed out and approximated results are not cached. Complete results
+    are cached, s.t. they can be shared between different projections, and
+    projected to the requested columns on the way out.
+    """
+    def __init__( self, pool: BasePool, cache: ResultCache, prefix: Tuple
+                , digits: int = 6 ):
+        """
+        Construct a cached pool.
+        Arguments:
+            - `pool`:   Session pool to wrap.
+            - `cache`:  `ResultCache`, `SQLiteCache` or `TieredCache`, may be
+                        shared between pools.
+            - `prefix`: Key prefix identifying the circuit, e.g.
+                        `(ckt_id, pdk_id, file_hash(netlist))`.
+            - `digits`: Significant digits sizings are quantized to.
+        """
+        self.pool   = pool
+        self.spec   = pool.spec
+        self.cache  = cache
+        self.prefix = tuple(prefix)
+        self.digits = digits
+
+    def __len__(self) -> int:
+        return len(self.pool)
+
+    def idle(self) -> list[int]:
+        return self.pool.idle()
+
+    def stats(self) -> dict[str, int]:
+        return self.pool.stats() | self.cache.stats()
+
+    def submit(self, idx: int, cmd: str, *args) -> Future:
+        """
+        Same as `submit` of the wrapped pool, but evaluations are cached.
+        """
+        if cmd != 'evaluate' or not args:
+            return self.pool.submit(idx, cmd, *args)
+
+        columns = args[1] if len(args) > 1 else None
+        key     = sizing_key(self.prefix, args[0], self.digits)
+        result  = self.cache.get(key)
+
+        if result is not None:
+            _      = self.pool.submit(idx, 'set_parameters', args[0].iloc[0].to_dict())
+            future = Future()
+            future.set_result(project(result, columns))
+            return future
+
+        def store(attempt: Future) -> None:
+            if attempt.exception() is None and \
+                    not getattr(attempt, 'sim_timeout', False) and \
+                    not getattr(attempt, 'approximate', False):
+                self.cache.put(key, attempt.result())
+
+        future = self.pool.submit(idx, cmd, args[0])
+        future.add_done_callback(store)
+        return future if columns is None else mirror(future, columns)
+
+    def close(self) -> None:
+        """
+        Close the wrapped pool and wait for queued writes to the cache.
+        """
+        self.pool.close()
+        _ = self.cache.flush() if hasattr(self.cache, 'flush') else None
@@ -3,8 +3,10 @@
 import os
 import errno
 from   functools   import partial
+from   itertools   import islice
 from   collections import OrderedDict
-from   typing      import Any, List, Optional, Type, Union, Callable, Mapping, Iterable
+from   concurrent.futures import as_completed, Future
+from   typing      import Any, List, Optional, Type, Union, Callable, Mapping, Iterable, Tuple
 import gym
 from   gym.spaces import Dict, Box
 from   gym        import GoalEnv
@@ -21,6 +23,7 @@ from .util    import *
 from .reward  import *
 from .trafo   import *
 from .seraf   import *
+from .cache   import *
 
 class CircusGeom(GoalEnv, VecEnv):
     """ Geometric Sizing Goal Environment """
@@ -40,6 +43,27 @@ class CircusGeom(GoalEnv, VecEnv):
                 , reward_fn: Callable              = None
                 , scale_observation: bool          = True
                 , auto_reset: bool                 = False
+                , backend: str                     = 'thread'
+                , num_shards: int                  = None
+                , workers: list[str]               = None
+                , batch_size: int                  = None
+                , sim_timeout: float               = None
+                , recycle_after: int               = None
+                , max_rss: int                     = None
+                , num_sessions: int                = None
+                , cache_size: int                  = None
+                , cache_memory: int                = None
+                , cache_path: str                  = None
+                , cache_disk: int                  = None
+                , approx_tolerance: float          = None
+                , approx_size: int                 = 10000
+                , reset_buffer: int                = None
+                , spec_cache: bool                 = True
+                , shared_sessions: bool            = False
+                , result_filter: Union[str,List[str]] = None
+                , info_mode: str                   = 'full'
+                , dtype: np.dtype                  = np.float64
+                , return_type: str                 = 'numpy'
                 , ):
         """
         Construct a Geometric Sizing Goal Environment
@@ -72,6 +96,80 @@ class CircusGeom(GoalEnv, VecEnv):
             - `scale_observation`: Scale the observations and goals as
                                    specified in trafo (default = True)
             - `auto_reset`:        Automatically reset environemt when done (default = False).
+            - `backend`:           Where simulator sessions are hosted:
+                                   'thread': In this process (default),
+                                   'process': Sharded across worker processes,
+                                   'remote': Hosted by worker daemons.
+            - `num_shards`:        Number of worker processes for the
+                                   'process' backend, defaults to number of
+                                   cores.
+            - `workers`:           List of worker daemon addresses
+                                   'host:port' for the 'remote' backend.
+            - `batch_size`:        Number of envs returned by `recv` in
+                                   asynchronous mode, see `send` and `recv`
+                                   (default = `num_envs`).
+            - `sim_timeout`:       Deadline for a single simulation in
+                                   seconds. Stragglers are resubmitted to an
+                                   idle session, if both attempts time out
+                                   `info['sim_timeout']` is set
+                                   (default = None, wait forever).
+            - `recycle_after`:     Restart a session in the background after
+                                   this many simulations (default = None).
+            - `max_rss`:           Restart a session in the background when
+                                   it exceeds this RSS in bytes
+                                   (default = None).
+            - `num_sessions`:      Number of simulator sessions the
+                                   environments are multiplexed over, e.g.
+                                   when licenses are limited
+                                   (default = `num_envs`).
+            - `cache_size`:        Cache results of up to this many sizings
+                                   in memory (default = None, no cache).
+            - `cache_memory`:      Limit memory of cached results to this
+                                   many bytes (default = None, no cache).
+            - `cache_path`:        Path to a persistent SQLite result store,
+                                   shared by all processes using it
+                                   (default = None, no store).
+            - `cache_disk`:        Limit size of the persistent result store
+                                   to this many bytes (default = None).
+            - `approx_tolerance`:  Reuse the performance of an evaluated
+                                   sizing, that deviates by at most this
+                                   relative tolerance in every parameter,
+                                   instead of simulating. Sets
+                                   `info['approximate']` (default = None).
+            - `approx_size`:       Number of evaluated sizings considered for
+                                   approximate reuse (default = 10000).
+            - `reset_buffer`:      Number of reset states precomputed in the
+                                   background on idle sessions
+                                   (default = None).
+            - `spec_cache`:        Cache the spec of the circuit in
+                                   `$CIRCUS_HOME/spec`. If it is cached,
+                                   sessions are started in the background
+                                   (default = True).
+            - `shared_sessions`:   Share sessions with all other environments
+                                   of this process for the same circuit.
+                                   Closing the environment returns its lease
+                                   on the sessions instead of stopping them,
+                                   'thread' backend only (default = False).
+            - `result_filter`:     Columns of the simulation results kept in
+                                   `last_obs` besides `obs_filter` and
+                                   `goal_filter`, all others are dropped
+                                   right where they are simulated:
+                                   'all': Keep everything,
+                                   'perf': All performance parameters,
+                                   [str]: List of columns (default = None).
+            - `info_mode`:         What `info` of each environment holds:
+                                   'full': Flags and `info_keys` (default),
+                                   'lite': Only flags, `info_keys` are an
+                                   attribute of the environment.
+            - `dtype`:             Floating point type of observations,
+                                   goals, rewards and their spaces, e.g.
+                                   np.float32 (default = np.float64). Raw
+                                   results are kept in double precision.
+            - `return_type`:       Type of returned observations, rewards
+                                   and dones:
+                                   'numpy': New arrays each step (default),
+                                   'torch': Reused (pinned) CPU tensors,
+                                   overwritten by the next step or reset.
         """
 
         self.ckt_id: str       = ckt_id
@@ -80,32 +178,68 @@ class CircusGeom(GoalEnv, VecEnv):
 
         self.circus_home       = os.environ.get( 'CIRCUS_HOME'
                                                , os.path.expanduser('~/.circus'))
-        self.ckt_cfg           = ckt_cfg if ckt_cfg and os.path.isfile(ckt_cfg) \
-                                    else f'{self.circus_home}/ckt/{self.ckt_id}.yml'
-        self.pdk_cfg           = pdk_cfg if pdk_cfg and os.path.isfile(pdk_cfg) \
-                                    else f'{self.circus_home}/pdk/{self.pdk_id}.yml'
-        self.netlist           = netlist if netlist and os.path.isfile(netlist) \
-                                    else f'{self.circus_home}/pdk/{self.pdk_id}/{self.ckt_id}.scs'
-
-        self.op_amps           = make_ops( self.ckt_cfg, self.pdk_cfg
-                                         , self.netlist, self.num_envs )
+        self.ckt_cfg, \
+        self.pdk_cfg, \
+        self.netlist           = config_paths( self.ckt_id, self.pdk_id
+                                             , ckt_cfg, pdk_cfg, netlist )
+
+        self.spec_path         = spec_path( self.ckt_id, self.pdk_id
+                                          , self.ckt_cfg, self.pdk_cfg
+                                          , self.netlist ) \
+                                    if spec_cache else None
+        cached                 = load_spec(self.spec_path) \
+                                    if spec_cache else None
+        make                   = partial( make_pool, backend, self.ckt_cfg
+                                        , self.pdk_cfg, self.netlist
+                                        , self.num_envs
+                                        , num_shards    = num_shards
+                                        , workers       = workers
+                                        , recycle_after = recycle_after
+                                        , max_rss       = max_rss
+                                        , sim_timeout   = sim_timeout
+                                        , num_sessions  = num_sessions
+                                        , shared        = shared_sessions )
+        self.pool              = LazyPool(make, cached[0], self.num_envs) \
+                                    if cached else make()
+        self.spec              = self.pool.spec
+        self.futures           = None
+        self.pending           = {}
+        self.batch_size        = min(batch_size or num_envs, num_envs)
 
         self.auto_reset: bool  = auto_reset
 
+        if info_mode not in [ 'full', 'lite' ]:
+            raise(ValueError( errno.EINVAL, os.strerror(errno.EINVAL)
+                            , f'Invalid Argument info_mode: {info_mode}'))
+
+        self.info_mode: str    = info_mode
+
+        if not np.issubdtype(dtype, np.floating):
+            raise(ValueError( errno.EINVAL, os.strerror(errno.EINVAL)
+                            , f'Invalid Argument dtype: {dtype}'))
+
+        self.dtype: np.dtype   = np.dtype(dtype)
+
+        if return_type not in [ 'numpy', 'torch' ]:
+            raise(ValueError( errno.EINVAL, os.strerror(errno.EINVAL)
+                            , f'Invalid Argument return_type: {return_type}'))
+
+        self.return_type: str  = return_type
+
         self.num_steps: int    = num_steps
         self.steps: np.array   = np.zeros(num_envs)
 
 
-        self.constraints       = self.op_amps[0].parameters \
-                               | self.op_amps[0].constraints
+        self.constraints       = self.spec.parameters \
+                               | self.spec.constraints
 
-        _                      = set_parameters( self.op_amps
-                                               , [ p.parameters
-                                                   for p in self.op_amps ] )
+        _                      = [ self.pool.submit( i, 'set_parameters'
+                                                   , self.spec.parameters )
+                                   for i in range(self.num_envs) ]
 
-        pf_ids                 = sorted(list(self.op_amps[0].performances.keys()))
-        op_ids                 = sorted(list(self.op_amps[0].dcop_params.keys()))
-        of_ids                 = sorted(list(self.op_amps[0].offs_params.keys()))
+        pf_ids                 = sorted(self.spec.performances)
+        op_ids                 = sorted(self.spec.dcop_params)
+        of_ids                 = sorted(self.spec.offs_params)
 
         if obs_filter == 'all':
             self.obs_filter    = sorted(pf_ids + op_ids + of_ids)
@@ -124,12 +258,17 @@ class CircusGeom(GoalEnv, VecEnv):
                                                    , self.obs_filter
                                                    , )
 
-        self.input_parameters  = sorted(list(self.op_amps[0].geom_init.keys()))
+        self.input_parameters  = sorted(list(self.spec.geom_init.keys()))
 
         self.goal_filter       = sorted(goal_filter or [ ident for ident
                                                          in self.obs_filter
                                                          if ident.islower() ])
 
+        self.result_filter     = None if result_filter == 'all' else \
+                                 sorted(set( self.obs_filter + self.goal_filter
+                                           + ( pf_ids if result_filter == 'perf'
+                                               else list(result_filter or []) ) ))
+
         self.goal_idx          = np.array([ i for i,p in enumerate(self.obs_filter)
                                               if p in self.goal_filter ])
 
@@ -149,28 +288,81 @@ class CircusGeom(GoalEnv, VecEnv):
                                     , dtype = np.float32 )
 
         self.observation_space = Dict({ 'observation':   Box( -np.Inf, np.Inf
-                                                            , (len(self.obs_filter),))
+                                                            , (len(self.obs_filter),)
+                                                            , dtype = self.dtype )
                                       , 'achieved_goal': Box( -np.Inf, np.Inf
-                                                            , (len(self.goal_filter),))
+                                                            , (len(self.goal_filter),)
+                                                            , dtype = self.dtype )
                                       , 'desired_goal':  Box( -np.Inf, np.Inf
-                                                            , (len(self.goal_filter),))
+                                                            , (len(self.goal_filter),)
+                                                            , dtype = self.dtype )
                                       , })
 
         self.scale_observation = scale_observation
 
         self.rng_seed          = seed
 
-        self.sizing            = pd.DataFrame.from_dict({ k: [v] for k,v in
-                                                          self.op_amps[0].geom_init.items()})
-        self.last_obs          = evaluate(self.op_amps, self.sizing)
+        init_sizing            = pd.DataFrame.from_dict({ k: [v] for k,v in
+                                                          self.spec.geom_init.items()})
+        init_obs               = cached[1] if cached else \
+                                 evaluate(self.pool, init_sizing)
+
+        if spec_cache and not cached:
+            store_spec(self.spec_path, self.spec, init_obs)
+
+        self.pool              = ApproximatePool( self.pool
+                                                , NeighbourIndex(approx_size)
+                                                , approx_tolerance ) \
+                                    if approx_tolerance else self.pool
+        caches                 = ( [ ResultCache(cache_size, cache_memory) ]
+                                   if (cache_size or cache_memory) else [] ) \
+                               + ( [ SQLiteCache(cache_path, cache_disk) ]
+                                   if cache_path else [] )
+        self.cache             = TieredCache(*caches) if len(caches) > 1 else \
+                                 caches[0] if caches else None
+        self.pool              = CachedPool( self.pool, self.cache
+                                           , ( self.ckt_id, self.pdk_id
+                                             , file_hash(self.netlist) ) ) \
+                                    if self.cache is not None else self.pool
+
+        self.sizing_table      = StateTable(init_sizing.columns, num_envs)
+        self.obs_table         = StateTable( self.result_filter or init_obs.columns
+                                           , num_envs )
+        self.goal_table        = StateTable(self.goal_filter, num_envs)
+
+        self.sizing_table.update(slice(None), self.sizing_table.rows(init_sizing))
+        self.obs_table.update(slice(None), self.obs_table.rows(init_obs))
+
+        self.tensors           = { 'observation':   self._tensor( (num_envs, len(self.obs_filter))
+                                                                , self.dtype )
+                                 , 'achieved_goal': self._tensor( (num_envs, len(self.goal_filter))
+                                                                , self.dtype )
+                                 , 'desired_goal':  self._tensor( (num_envs, len(self.goal_filter))
+                                                                , self.dtype )
+                                 , 'reward':        self._tensor((num_envs,), self.dtype)
+                                 , 'done':          self._tensor((num_envs,), np.bool_)
+                                 , } if return_type == 'torch' else None
+
+        self.observation_pipeline = ObservationPipeline( self.ckt_id
+                                                       , self.constraints
+                                                       , self.obs_table.columns
+                                                       , self.obs_filter
+                                                       , self.goal_filter
+                                                       , num_envs
+                                                       , self.dtype
+                                                       , tuple( self.tensors[k].numpy()
+                                                                for k in [ 'observation'
+                                                                         , 'achieved_goal'
+                                                                         , 'desired_goal' ] )
+                                                         if self.tensors else None )
 
         if isinstance(goal_init, str) and goal_init == 'noisy':
             self.goal_init      = goal_init
             ref_goal_op         = reference_goal(self.ckt_id, self.constraints)
-            ref_goal            = self.last_obs[[c for c in self.goal_filter
-                                                   if c in self.last_obs.columns]
-                                               ].join(ref_goal_op[[c for c in self.goal_filter
-                                                                     if c not in self.last_obs.columns]])
+            ref_goal            = init_obs[[c for c in self.goal_filter
+                                               if c in init_obs.columns]
+                                          ].join(ref_goal_op[[c for c in self.goal_filter
+                                                                if c not in init_obs.columns]])
             ref_goals           = ref_goal.iloc[ np.arange(len(ref_goal)
                                                           ).repeat(self.num_envs)
                                                ].reset_index()
@@ -197,11 +389,15 @@ class CircusGeom(GoalEnv, VecEnv):
         self.new_goal          = goal_generator( self.goal_init
                                                , self.reference_goal
                                                , )
-        self.goal              = self.new_goal()
+        self.goal_table.update(slice(None), self.goal_table.rows(self.new_goal()))
 
         self.act_unscaler      = geometric_unscaler( self.constraints
                                                    , self.input_parameters )
 
+        self.reset_states      = ResetBuffer( self.pool, reset_buffer
+                                            , columns = self.result_filter ) \
+                                    if reset_buffer else None
+
         VecEnv.__init__( self, self.num_envs
                        , self.observation_space
                        , self.action_space )
@@ -213,25 +409,54 @@ class CircusGeom(GoalEnv, VecEnv):
             - `env_ids`: List of environment IDs that will be closed.
                          Default = None closes all.
         """
-        for i in (env_ids or range(self.num_envs)):
-            ps.stop_session(self.op_amps[i].session, True)
+        if not env_ids and self.reset_states:
+            self.reset_states.close()
+        stop_sessions(self.pool, env_ids or range(self.num_envs))
+        if not env_ids:
+            self.pool.close()
+
+    @property
+    def sizing(self) -> pd.DataFrame:
+        """
+        Current sizing of all environments.
+        """
+        return self.sizing_table.frame
+
+    @sizing.setter
+    def sizing(self, sizing: Union[pd.DataFrame, dict[int, dict[str, float]]]) -> None:
+        sizing = sizing if isinstance(sizing, pd.DataFrame) else \
+                 pd.DataFrame.from_dict(sizing, orient = 'index')
+        self.sizing_table.update(slice(None), self.sizing_table.rows(sizing))
+
+    @property
+    def last_obs(self) -> pd.DataFrame:
+        """
+        Last simulation results of all environments.
+        """
+        return self.obs_table.frame
+
+    @property
+    def goal(self) -> pd.DataFrame:
+        """
+        Current goal of all environments.
+        """
+        return self.goal_table.frame
 
-    def observation_dict( self, observation: pd.DataFrame
+    def observation_dict( self, observation: np.ndarray
+                        , env_ids: list[int] = None
                         ) -> dict[str, np.ndarray]:
         """
-        Takes an observation from a serafin evaluation and returns a
-        `GoalEnv` compliant `OrderedDict`.
+        Takes rows of `obs_table` and returns a `GoalEnv` compliant
+        `OrderedDict`. If `env_ids` is given, the rows of `observation` belong
+        to these environments.
         """
-        state       = filter_results(self.obs_filter, observation).values
-        achieved    = filter_results(self.goal_filter, observation).values
-        desired     = self.goal.values
+        desired     = self.goal_table.values if env_ids is None else \
+                      self.goal_table.values[env_ids]
 
-        obs         = np.nan_to_num( self.obs_scaler(state)
-                                     if self.scale_observation else state )
-        a_goal      = np.nan_to_num( self.goal_scaler(achieved)
-                                     if self.scale_observation else achieved )
-        d_goal      = np.nan_to_num( self.goal_scaler(desired)
-                                     if self.scale_observation else self.goal )
+        obs, \
+        a_goal, \
+        d_goal      = self.observation_pipeline( observation, desired
+                                               , self.scale_observation )
 
         return OrderedDict({ 'observation':   obs
                            , 'achieved_goal': a_goal
@@ -243,36 +468,21 @@ class CircusGeom(GoalEnv, VecEnv):
         Arguments:
             - `env_mask`: Boolean mask of environemts that will be reset.
                           Passing the `done` vector works. This argument is
-                          prioritized over `env_ids`.
+                          prioritized over `env_ids`, if no environment is
+                          masked none is reset.
             - `env_ids`: List of integer IDs of environments that will be reset.
                          This argument is discarded in favour of `env_mask` if
                          given.
         """
 
-        reset_ids             = [ i for i,m in enumerate(env_mask) if m
-                                ] or env_ids or range(self.num_envs)
-        const_ids             = [ i for i in range(self.num_envs)
-                                    if i not in reset_ids ]
+        reset_ids   = [ i for i,m in enumerate(env_mask) if m
+                      ] if len(env_mask) > 0 else env_ids or range(self.num_envs)
 
-        cur_sizing            = current_sizing(self.op_amps)
-        rng_sizing            = random_sizing(self.op_amps)
-        self.sizing           = pd.concat( [ cur_sizing.iloc[const_ids]
-                                           , rng_sizing.iloc[reset_ids] ]
-                                         , axis = 0
-                                         ).sort_index()
+        self._reset_envs(list(reset_ids))
 
-        self.last_obs         = evaluate(self.op_amps, self.sizing)
+        observation = self.observation_dict(self.obs_table.values)
 
-        self.goal             = pd.concat( [ self.goal.iloc[const_ids]
-                                           , self.new_goal().iloc[reset_ids]]
-                                         , axis = 0
-                                         ).sort_index()
-
-        observation           = self.observation_dict(self.last_obs)
-
-        self.steps[reset_ids] = 0
-
-        return observation
+        return self._returned(observation)
 
     def step(self, actions: np.ndarray) -> VecEnvStepReturn:
         """
@@ -284,44 +494,211 @@ class CircusGeom(GoalEnv, VecEnv):
         self.step_async(actions)
         return self.step_wait()
 
+    def action_to_sizing(self, actions: np.ndarray) -> pd.DataFrame:
+        """
+        Unscale actions ∈ [-1.0;1.0] into a geometric sizing.
+        Arguments:
+            - `actions`: Actions with shape [n, action_space].
+        """
+        unscaled = self.act_unscaler(np.clip( actions
+                                            , self.action_space.low
+                                            , self.action_space.high ))
+        return self.parameters_to_sizing(unscaled)
+
+    def parameters_to_sizing(self, parameters: np.ndarray) -> pd.DataFrame:
+        """
+        Turn unscaled input parameters into a geometric sizing.
+        Arguments:
+            - `parameters`: Parameters with shape [n, len(input_parameters)].
+        """
+        return pd.DataFrame(parameters, columns = self.input_parameters)
+
+    def evaluate_batch( self, sizings: np.ndarray, scaled: bool = True
+                      ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Evaluate any number of sizings, without touching episode state, steps
+        or goals. Rows are streamed through the session pool, s.t. `n` may be
+        larger than `num_envs`. Returns the scaled and raw performance as
+        `(observation, raw)`, each with shape [n, len(obs_filter)].
+        Arguments:
+            - `sizings`: Sizings with shape [n, len(input_parameters)] in the
+                         design space of the environment.
+            - `scaled`:  Whether `sizings` are scaled like actions ∈ [-1.0;1.0]
+                         (default = True) or given in real units.
+        """
+        sizing  = self.action_to_sizing(sizings) if scaled else \
+                  self.parameters_to_sizing(np.atleast_2d(sizings))
+        results = evaluate_batch(self.pool, sizing, self.obs_filter)
+        raw     = filter_results(self.obs_filter, results).values
+        return (np.nan_to_num(self.obs_scaler(raw)).astype(self.dtype), raw)
+
     def step_async(self, actions: np.ndarray) -> None:
         """
         Initiate a step in the Environment by storing the action to
-        `self.sizing`.
+        `self.sizing` and submitting its evaluation to the session pool.
+        Returns right away.
         Arguments:
             - `actions`: Take Action with shape [num_envs, action_space].
         """
-
-        unscaled    = self.act_unscaler(np.clip( actions
-                                               , self.action_space.low
-                                               , self.action_space.high ))
-        self.sizing = pd.DataFrame(unscaled, columns = self.input_parameters)
+        sizing       = self.action_to_sizing(actions)
+        self.futures = evaluate_async( self.pool, sizing
+                                     , columns = self.result_filter )
+        self.sizing_table.update(slice(None), self.sizing_table.rows(sizing))
 
     def step_wait(self) -> VecEnvStepReturn:
         """
-        Complete a step in the Environment by evaluating `self.sizing`.
-        """
-        self.last_obs = evaluate(self.op_amps, self.sizing)
-        observation   = self.observation_dict(self.last_obs)
-        reward        = self.calculate_reward(observation)
+        Complete a step in the Environment by waiting for the evaluation of
+        `self.sizing`. If none was submitted, it is evaluated now.
+        """
+        futures       = self.futures or \
+                        evaluate_async( self.pool, self.sizing
+                                      , columns = self.result_filter )
+        self.futures  = None
+        self.obs_table.update_frames(slice(None), [ f.result() for f in futures ])
+        observation   = self.observation_dict(self.obs_table.values)
+        reward        = np.asarray( self.calculate_reward(observation)
+                                  , dtype = self.dtype )
         self.steps    = self.steps + 1
         done          = (reward == 0) | (self.steps >= self.num_steps)
-        info_dict     = { 'outputs': self.obs_filter
-                        , 'goal':    self.goal_filter
-                        , 'inputs':  self.input_parameters
-                        , }
-        info          = [ info_dict | {'is_success': s}
-                          for s in (reward == 0).tolist() ]
+        info          = self.step_info(reward, futures)
 
         if self.auto_reset and done.any():
             for idx,inf in enumerate(info):
-                inf["terminal_obs"] = observation["observation"][idx]
-                inf["target"]       = observation["desired_goal"][idx]
-            observation = self.reset(done)
+                inf["terminal_obs"] = observation["observation"][idx].copy()
+                inf["target"]       = observation["desired_goal"][idx].copy()
+            self._reset_envs(np.flatnonzero(done).tolist())
+            observation = self.observation_dict(self.obs_table.values)
 
+        return (self._returned(observation), *self._returned_flags(reward, done), info)
 
+    @property
+    def info_keys(self) -> dict[str, list[str]]:
+        """
+        Static part of `info`, the same for all environments and steps.
+        """
+        return { 'outputs': self.obs_filter
+               , 'goal':    self.goal_filter
+               , 'inputs':  self.input_parameters
+               , }
 
-        return (observation, reward, done, info)
+    def step_info(self, reward: np.ndarray, futures: list[Future]) -> list[dict]:
+        """
+        `info` of each environment after a step, with flags for success,
+        timed out and approximated simulations. Also holds `info_keys`,
+        unless `info_mode = 'lite'`.
+        """
+        static = {} if self.info_mode == 'lite' else self.info_keys
+        return [ static | { 'is_success': s, 'sim_timeout': t, 'approximate': a }
+                 for s,t,a in zip( (reward == 0).tolist()
+                                 , timed_out(futures)
+                                 , approximated(futures) ) ]
+
+    def send(self, actions: np.ndarray, env_ids: Iterable[int] = None) -> None:
+        """
+        Asynchronous counterpart of `step_async` for only some environments.
+        Submits the evaluation of the given actions and returns right away,
+        collect the results with `recv`. Environments must be `reset` first.
+        Arguments:
+            - `actions`: Actions with shape [len(env_ids), action_space].
+            - `env_ids`: Environments the actions belong to, all by default.
+                         None of them may be waiting for `recv`.
+        """
+        env_ids = list(range(self.num_envs) if env_ids is None else env_ids)
+        busy    = set(env_ids) & set(self.pending.keys())
+
+        if busy:
+            raise ValueError( errno.EBUSY, os.strerror(errno.EBUSY)
+                            , f'Environments {sorted(busy)} are still pending.')
+
+        sizing        = self.action_to_sizing(actions)
+        futures       = evaluate_async( self.pool, sizing, env_ids
+                                      , self.result_filter )
+        self.pending |= dict(zip(env_ids, futures))
+        self.sizing_table.update(env_ids, self.sizing_table.rows(sizing))
+
+    def recv(self) -> Tuple[ dict[str, np.ndarray], np.ndarray, np.ndarray
+                           , list[dict], np.ndarray ]:
+        """
+        Asynchronous counterpart of `step_wait`. Blocks until `batch_size`
+        pending environments finished simulating and returns the results of
+        the first ones, as `(observation, reward, done, info, env_ids)`.
+        Environments that are done are reset right away, `info` then holds
+        the terminal observation.
+        """
+        num         = min(self.batch_size, len(self.pending))
+        futures     = { f: i for i,f in self.pending.items() }
+        env_ids     = [ futures[f] for f in islice(as_completed(futures), num) ]
+        futures     = [ self.pending.pop(i) for i in env_ids ]
+
+        self.obs_table.update_frames(env_ids, [ f.result() for f in futures ])
+
+        observation = self.observation_dict(self.obs_table.values[env_ids], env_ids)
+        reward      = np.asarray(self.calculate_reward(observation), dtype = self.dtype)
+        self.steps[env_ids] = self.steps[env_ids] + 1
+        done        = (reward == 0) | (self.steps[env_ids] >= self.num_steps)
+        info        = [ inf | { 'env_id': i }
+                        for i,inf in zip(env_ids, self.step_info(reward, futures)) ]
+
+        if done.any():
+            for idx,inf in enumerate(info):
+                if done[idx]:
+                    inf["terminal_obs"] = observation["observation"][idx].copy()
+                    inf["target"]       = observation["desired_goal"][idx].copy()
+            self._reset_envs([ i for i,d in zip(env_ids, done) if d ])
+            observation = self.observation_dict( self.obs_table.values[env_ids]
+                                               , env_ids )
+
+        return ( self._returned(observation), *self._returned_flags(reward, done)
+               , info, np.array(env_ids) )
+
+    def _tensor(self, shape: Tuple[int, ...], dtype: np.dtype) -> pt.Tensor:
+        """
+        Uninitialized CPU tensor, pinned if there is a GPU to copy it to.
+        """
+        tensor = pt.empty(shape, dtype = pt.from_numpy(np.empty(0, dtype = dtype)).dtype)
+        return tensor.pin_memory() if pt.cuda.is_available() else tensor
+
+    def _returned(self, observation: dict[str, np.ndarray]) -> dict:
+        """
+        Observation as returned to the caller, i.e. the tensors sharing memory
+        with it if `return_type = 'torch'`.
+        """
+        if self.tensors is None:
+            return observation
+        num = len(observation['observation'])
+        return OrderedDict({ k: self.tensors[k][:num] for k in observation })
+
+    def _returned_flags(self, reward: np.ndarray, done: np.ndarray) -> Tuple:
+        """
+        Rewards and dones as returned to the caller, written into the reused
+        tensors if `return_type = 'torch'`.
+        """
+        if self.tensors is None:
+            return (reward, done)
+        num = len(reward)
+        np.copyto(self.tensors['reward'].numpy()[:num], reward)
+        np.copyto(self.tensors['done'].numpy()[:num], done)
+        return (self.tensors['reward'][:num], self.tensors['done'][:num])
+
+    def _reset_envs(self, env_ids: list[int]) -> None:
+        """
+        Reset only the given idle environments, without touching others. The
+        sizing and performance of all other environments is kept as is, only
+        the given ones are simulated, unless there are precomputed states.
+        """
+        ready    = self.reset_states.take(len(env_ids)) \
+                        if self.reset_states else []
+        live_ids = env_ids[len(ready):]
+
+        sizing   = [ random_sizing(self.pool, live_ids) ] if live_ids else []
+        futures  = evaluate_async( self.pool, sizing[0], live_ids
+                                 , self.result_filter ) if live_ids else []
+
+        self.sizing_table.update_frames(env_ids, [ s for s,_ in ready ] + sizing)
+        self.obs_table.update_frames( env_ids, [ r for _,r in ready ]
+                                             + [ f.result() for f in futures ] )
+        self.goal_table.update(env_ids, self.goal_table.rows(self.new_goal())[env_ids])
+        self.steps[env_ids] = 0
 
     def compute_reward( self, achieved_goal: object, desired_goal: object
                       , info: Mapping[str, Any] ) -> np.array:
@@ -332,7 +709,8 @@ class CircusGeom(GoalEnv, VecEnv):
         observation = { "achieved_goal": achieved_goal
                       , "desired_goal":  desired_goal
                       , }
-        return self.calculate_reward(observation = observation)
+        return np.asarray( self.calculate_reward(observation = observation)
+                         , dtype = self.dtype )
 
     def get_attr( self, attr_name: str, indices: VecEnvIndices = None
                 ) -> List[Any]:
@@ -396,20 +774,26 @@ class CircusElec(CircusGeom):
 
         self.act_unscaler      = electric_unscaler(self.ckt_id)
 
-    def step_async(self, actions: np.ndarray) -> None:
+    def action_to_sizing(self, actions: np.ndarray) -> pd.DataFrame:
         """
-        Initiate a step in the Environment by transforming the action in the
-        elctrical space to geometric sizing parameters and storing it to
-        `self.sizing`.
+        Transform actions in the elctrical space to geometric sizing
+        parameters.
         Arguments:
-            - `actions`: Take Action with shape [num_envs, action_space].
+            - `actions`: Actions with shape [n, action_space].
         """
-        unscaled    = self.act_unscaler(np.clip( actions
-                                               , self.action_space.low
-                                               , self.action_space.high ))
+        unscaled = self.act_unscaler(np.clip( actions
+                                            , self.action_space.low
+                                            , self.action_space.high ))
+        return self.parameters_to_sizing(unscaled)
 
-        self.sizing = pd.concat([ self.transformation(*action.tolist())
-                                  for action in list(unscaled) ])
+    def parameters_to_sizing(self, parameters: np.ndarray) -> pd.DataFrame:
+        """
+        Transform unscaled electrical parameters to a geometric sizing.
+        Arguments:
+            - `parameters`: Parameters with shape [n, len(input_parameters)].
+        """
+        return pd.concat([ self.transformation(*parameter.tolist())
+                           for parameter in list(parameters) ])
 
 class CircusGeomVec(CircusGeom):
     """ Geometric Sizing Non-Goal Environment """
@@ -32,6 +32,11 @@ parser.add_argument( '-gn', '--goals', nargs = '+', default = []
                    , help = 'List of goal parameters.')
 parser.add_argument( '-o', '--states', nargs = '+', default = []
                    , help = 'List of observation / state parameters.')
+parser.add_argument( '--cache', type = str, default = None
+                   , help = 'Path to persistent simulation result store.')
+parser.add_argument( '--info', type = str, default = 'full'
+                   , choices = [ 'full', 'lite' ]
+                   , help = 'Info mode, \'lite\' omits the static keys from step info.')
 
 CircusEnv = namedtuple('Environment', 'env ckt_id pdk_id space variant num_envs')
 
@@ -39,6 +44,7 @@ def make_env( ckt_id: str, pdk_id: str, space: str, variant: int
             , n_envs: int, n_steps: int = 50, scale: bool = True
             , obs_filter: Union[str, list[str]] = 'perf'
             , goal_filter: Union[str, list[str]] = 'perf'
+            , cache_path: str = None, info_mode: str = 'full'
             ) -> CircusEnv:
     """
     Construct a Circus Environment wrapper for HTTP Access.
@@ -52,6 +58,9 @@ def make_env( ckt_id: str, pdk_id: str, space: str, variant: int
                             , goal_filter       = goal_filter
                             , obs_filter        = obs_filter
                             , scale_observation = scale
+                            , cache_path        = cache_path
+                            , result_filter     = 'perf'
+                            , info_mode         = info_mode
                             , )
 
     return CircusEnv(env, ckt_id, pdk_id, space, variant, n_envs)
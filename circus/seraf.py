@@ -1,82 +1,1407 @@
 """ Serafin Parallel Processing Utilities """
 
 import os
+import time
+import atexit
+import logging
+import heapq
+import queue
 import operator
-from typing import Any, List, Optional, Type, Union, Callable, Iterable
+import threading
+import multiprocessing as mp
+from argparse import ArgumentParser
+from multiprocessing.connection import Connection, Listener, Client
+from multiprocessing import AuthenticationError
+from typing import Any, List, Optional, Type, Union, Callable, Iterable, Tuple
+from itertools import repeat, count
+from collections import namedtuple
 from multiprocessing.dummy import Pool
+from concurrent.futures import ThreadPoolExecutor, Future, InvalidStateError
 
 import numpy as np
 import pandas as pd
 import serafin as sf
 import pyspectre as ps
 
+# Commands a session pool dispatches by name. Every command is called with the
+# session as first argument, except `make`, which creates a session from
+# `(pdk_cfg, ckt_cfg, netlist)`. Commands must be module level functions, s.t.
+# they can be sent to worker processes.
+Simulator = namedtuple( 'Simulator', 'make evaluate set_parameters '
+                                     'current_sizing random_sizing stop alive '
+                                     'rss' )
+
+def _set_parameters(op: sf.OperationalAmplifier, sizing: dict[str,float]) -> bool:
+    return ps.set_parameters(op.session, sizing)
+
+def _stop_session(op: sf.OperationalAmplifier) -> bool:
+    return ps.stop_session(op.session, True)
+
+def _session_alive(op: sf.OperationalAmplifier) -> bool:
+    repl = getattr(op.session, 'repl', None)
+    return repl.isalive() if repl is not None else True
+
+def _session_rss(op: sf.OperationalAmplifier) -> int:
+    pid = getattr(getattr(op.session, 'repl', None), 'pid', None)
+    try:
+        with open(f'/proc/{pid}/status', 'r') as status:
+            return next( int(line.split()[1]) * 1024 for line in status
+                         if line.startswith('VmRSS') )
+    except (OSError, StopIteration, ValueError):
+        return 0
+
+SERAFIN = Simulator( make           = sf.operational_amplifier
+                   , evaluate       = sf.evaluate
+                   , set_parameters = _set_parameters
+                   , current_sizing = sf.current_sizing
+                   , random_sizing  = sf.random_sizing
+                   , stop           = _stop_session
+                   , alive          = _session_alive
+                   , rss            = _session_rss
+                   , )
+
+# Shared secret of workers and clients. Requests are pickled, so anyone who
+# knows it can run code on the worker. There is no default, since loopback
+# addresses are reachable by every user of the machine.
+AUTHKEY = os.environ.get('CIRCUS_AUTHKEY', '').encode() or None
+
+logger  = logging.getLogger(__name__)
+
+parser = ArgumentParser()
+parser.add_argument( '--host', type = str, default = 'localhost'
+                   , help = 'Host address')
+parser.add_argument( '-p', '--port', type = int, default = '6008'
+                   , help = 'Worker Port')
+parser.add_argument( '-e', '--env', type = str, default = 'mil'
+                   , help = 'Serafin circuit ID, see Circus doc for what\'s available')
+parser.add_argument( '--pdk', type = str, default = 'xh035'
+                   , help = 'PDK ID, see Circus doc for what\'s available')
+parser.add_argument( '-n', '--num', type = int, default = 1
+                   , help = 'Number of hosted sessions')
+parser.add_argument( '--ckt-cfg', type = str, default = None
+                   , help = 'Path to ckt_id.yml, defaults to $CIRCUS_HOME')
+parser.add_argument( '--pdk-cfg', type = str, default = None
+                   , help = 'Path to pdk_id.yml, defaults to $CIRCUS_HOME')
+parser.add_argument( '--netlist', type = str, default = None
+                   , help = 'Path to netlist, defaults to $CIRCUS_HOME')
+parser.add_argument( '--recycle-after', type = int, default = None
+                   , help = 'Restart sessions after this many simulations')
+parser.add_argument( '--max-rss', type = int, default = None
+                   , help = 'Restart sessions exceeding this RSS in bytes')
+
+def project(result: pd.DataFrame, columns: Optional[list[str]]) -> pd.DataFrame:
+    """
+    Only the given `columns` of `result`, all of them if `None`. Columns that
+    are not part of `result` are `NaN`.
+    """
+    return result if columns is None else result.reindex(columns = columns)
+
 def make_ops( ckt_cfg: str, pdk_cfg: str, netlist: str, num: int
+            , simulator: Simulator = SERAFIN
             ) -> Iterable[sf.OperationalAmplifier]:
     """
     Create `num` op amp sessions, where `num` ∈ [1 .. ∞).
     Arguments:
-        - `ckt_cfg`: path to `ckt_id.yml`
-        - `pdk_cfg`: path to `pdk_id.yml`
-        - `netlist`: path to `ckt_id.scs`
+        - `ckt_cfg`:   path to `ckt_id.yml`
+        - `pdk_cfg`:   path to `pdk_id.yml`
+        - `netlist`:   path to `ckt_id.scs`
+        - `simulator`: Simulator commands, default `SERAFIN`.
     Returns:
         - `list[serafin.OperationalAmplifier]`
     """
     with Pool(num) as pl:
         args = zip(num * [pdk_cfg], num * [ckt_cfg], num * [netlist])
-        ops  = pl.starmap(sf.operational_amplifier, args)
+        ops  = pl.starmap(simulator.make, args)
 
     return ops
 
-def set_parameters( ops: Iterable[sf.OperationalAmplifier]
-                  , sizing: Iterable[dict[str,float]] ) -> bool:
+OpSpec = namedtuple( 'OpSpec', 'parameters constraints performances '
+                               'dcop_params offs_params geom_init' )
+
+def op_spec(op: sf.OperationalAmplifier) -> OpSpec:
     """
-    Set sizing parameters. Index in `sizing` list corresponds to index in `ops`
-    list.
+    Static information about an op amp session, that is the same for all
+    sessions created with the same configuration.
     """
-    num = len(ops)
-    with Pool(num) as pl:
-        ret = pl.starmap( lambda o,s: ps.set_parameters(o.session, s)
-                        , zip(ops, sizing) )
-    return all(ret)
+    return OpSpec( dict(op.parameters), dict(op.constraints)
+                 , list(op.performances.keys()), list(op.dcop_params.keys())
+                 , list(op.offs_params.keys()), dict(op.geom_init) )
+
+Packed = namedtuple('Packed', 'values columns')
 
-def current_sizing( ops: Iterable[sf.OperationalAmplifier] ) -> pd.DataFrame:
+def pack(x: Any) -> Any:
     """
-    Retrieve the current sizing of all `ops`. Row index corresponds to index in
-    `ops` list.
+    Pack a `pd.DataFrame` into a numpy array and column list for sending it
+    across process boundaries. Anything else is returned as is.
     """
-    num = len(ops)
-    with Pool(num) as pl:
-        sizing = pd.concat(pl.map(sf.current_sizing, ops))
-    return sizing
+    return Packed(x.to_numpy(), list(x.columns)) \
+                if isinstance(x, pd.DataFrame) else x
+
+def unpack(x: Any) -> Any:
+    """
+    Inverse of `pack`.
+    """
+    return pd.DataFrame(x.values, columns = x.columns) \
+                if isinstance(x, Packed) else x
+
+def settle(future: Future, result: Any = None, exception: Exception = None) -> None:
+    """
+    Resolve `future`, unless it was resolved already.
+    """
+    try:
+        if exception is None:
+            future.set_result(result)
+        else:
+            future.set_exception(exception)
+    except InvalidStateError:
+        pass
+
+def settled(result: Any) -> Future:
+    """
+    A future resolved with `result`.
+    """
+    future = Future()
+    future.set_result(result)
+    return future
+
+class BasePool:
+    """
+    Common functionality of session pools. Sub classes implement `__len__`,
+    `submit` and `close`, and call `track` for every submitted future.
+    """
+    def track(self, idx: int, future: Future) -> Future:
+        """
+        Count `future` as in flight on session `idx` until it is done.
+        """
+        with self.load_lock:
+            self.load[idx] += 1
+
+        def untrack(_: Future) -> None:
+            with self.load_lock:
+                self.load[idx] -= 1
+
+        future.add_done_callback(untrack)
+        return future
+
+    def idle(self) -> list[int]:
+        """
+        Indices of sessions that have nothing to do.
+        """
+        with self.load_lock:
+            return [ i for i,l in enumerate(self.load) if l == 0 ]
+
+    def map( self, cmd: str, *iterables, idxs: Iterable[int] = None
+           ) -> list:
+        """
+        Call simulator command `cmd` for all sessions, or only those in
+        `idxs`, in parallel and wait for the results. Index in `iterables`
+        corresponds to index of the session (in `idxs`).
+        """
+        idxs    = range(len(self)) if idxs is None else idxs
+        args    = zip(*iterables) if iterables else repeat(())
+        futures = [ self.submit(i, cmd, *a) for i,a in zip(idxs, args) ]
+        return [ f.result() for f in futures ]
+
+class SessionPool(BasePool):
+    """
+    Long-lived pool of serafin sessions. Every session is pinned to its own
+    worker thread, s.t. all calls for a given session are dispatched through
+    the same worker and no threads are spawned per call.
+
+    If `config` is given, sessions are checked before every call. A dead
+    session is re-created from `config` and the last sizing that was set or
+    evaluated on it is replayed, without touching other sessions. The number
+    of re-created sessions is counted in `respawns`.
+
+    Additionally, sessions that ran `recycle_after` simulations or exceed
+    `max_rss` bytes are recycled. A replacement is started in the background,
+    one at a time, and swapped in once it is ready, s.t. the pool never runs
+    with less live sessions. Recycled sessions are counted in `recycles`.
+    """
+    def __init__( self, ops: Iterable[sf.OperationalAmplifier]
+                , simulator: Simulator = SERAFIN
+                , config: Tuple[str, str, str] = None
+                , recycle_after: int = None, max_rss: int = None ):
+        """
+        Construct a session pool.
+        Arguments:
+            - `ops`:           Sessions obtained from `make_ops`.
+            - `simulator`:     Simulator commands, default `SERAFIN`.
+            - `config`:        `(ckt_cfg, pdk_cfg, netlist)` the sessions were
+                               created with, enables respawning and recycling.
+            - `recycle_after`: Recycle sessions after this many simulations.
+            - `max_rss`:       Recycle sessions exceeding this RSS in bytes.
+        """
+        self.ops           = ops
+        self.simulator     = simulator
+        self.config        = config
+        self.sizing        = [ None for _ in ops ]
+        self.sims          = [ 0 for _ in ops ]
+        self.simulations   = 0
+        self.respawns      = 0
+        self.recycles      = 0
+        self.stats_lock    = threading.Lock()
+        self.recycle_after = recycle_after
+        self.max_rss       = max_rss
+        self.worn          = set()
+        self.recycling     = queue.Queue()
+        self.recycler      = threading.Thread( target = self._recycle
+                                             , daemon = True )
+        if config and (recycle_after or max_rss):
+            self.recycler.start()
+        self.workers   = [ ThreadPoolExecutor( max_workers        = 1
+                                             , thread_name_prefix = f'circus-{i}' )
+                           for i,_ in enumerate(ops) ]
+
+        self.epochs    = [ 0 for _ in ops ]
+        self.current   = [ None for _ in ops ]
+        self.started   = [ 0.0 for _ in ops ]
+
+        self.spec      = op_spec(ops[0])
+        self.load      = [ 0 for _ in ops ]
+        self.load_lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.ops)
+
+    def submit(self, idx: int, cmd: str, *args) -> Future:
+        """
+        Call simulator command `cmd` with `(op, *args)` on the worker owning
+        session `idx`.
+        """
+        return self.track(idx, self._dispatch(idx, Future(), cmd, args))
+
+    def _dispatch(self, idx: int, future: Future, cmd: str, args: tuple) -> Future:
+        with self.load_lock:
+            task = self.workers[idx].submit( self._run, idx, self.epochs[idx]
+                                           , future, cmd, args )
+        task.add_done_callback( lambda t: t.cancelled() and
+                                          self._dispatch(idx, future, cmd, args) )
+        return future
+
+    def _run( self, idx: int, epoch: int, future: Future, cmd: str
+            , args: tuple ) -> None:
+        if epoch != self.epochs[idx]:
+            self._dispatch(idx, future, cmd, args)
+            return
+        self.current[idx] = future
+        self.started[idx] = time.monotonic()
+        try:
+            settle(future, result = self._call(idx, epoch, cmd, *args))
+        except Exception as exc:
+            settle(future, exception = exc)
+
+    def _call(self, idx: int, epoch: int, cmd: str, *args) -> Any:
+        fn      = getattr(self.simulator, cmd)
+        health  = self.config is not None and cmd != 'stop'
+        columns = args[1] if cmd == 'evaluate' and len(args) > 1 else None
+        args    = args[:1] if cmd == 'evaluate' else args
+
+        if health and not self.simulator.alive(self.ops[idx]):
+            self.respawn(idx)
+
+        try:
+            result = fn(self.ops[idx], *args)
+        except Exception:
+            if not health or epoch != self.epochs[idx] or \
+                    self.simulator.alive(self.ops[idx]):
+                raise
+            self.respawn(idx)
+            result = fn(self.ops[idx], *args)
+
+        if epoch != self.epochs[idx]:
+            raise TimeoutError(f'Session {idx} was killed.')
+
+        if cmd in ['evaluate', 'set_parameters'] and args and args[0] is not None:
+            sizing           = args[0]
+            self.sizing[idx] = sizing.iloc[0].to_dict() \
+                                    if isinstance(sizing, pd.DataFrame) else \
+                               (self.sizing[idx] or {}) | dict(sizing)
+
+        if cmd == 'evaluate':
+            result            = project(result, columns)
+            self.sims[idx]   += 1
+            with self.stats_lock:
+                self.simulations += 1
+            if self.recycler.is_alive() and (idx not in self.worn) and \
+                    ( (self.recycle_after and self.sims[idx] >= self.recycle_after) or
+                      (self.max_rss and self.simulator.rss(self.ops[idx]) > self.max_rss) ):
+                self.worn.add(idx)
+                self.recycling.put(idx)
+
+        return result
+
+    def _recycle(self) -> None:
+        ckt_cfg, pdk_cfg, netlist = self.config
+        while (idx := self.recycling.get()) is not None:
+            try:
+                spare = self.simulator.make(pdk_cfg, ckt_cfg, netlist)
+            except Exception:
+                self.worn.discard(idx)
+                continue
+            worn  = self.workers[idx].submit(self._swap, idx, spare).result()
+            try:
+                self.simulator.stop(worn)
+            except Exception:
+                pass
+
+    def _swap( self, idx: int, spare: sf.OperationalAmplifier
+             ) -> sf.OperationalAmplifier:
+        worn           = self.ops[idx]
+        self.ops[idx]  = spare
+        self.sims[idx] = 0
+        if self.sizing[idx]:
+            self.simulator.set_parameters(spare, self.sizing[idx])
+        with self.stats_lock:
+            self.recycles += 1
+        self.worn.discard(idx)
+        return worn
+
+    def extend(self, ops: Iterable[sf.OperationalAmplifier]) -> None:
+        """
+        Add more sessions, created with the same configuration, to the pool.
+        """
+        with self.load_lock:
+            for op in ops:
+                self.workers.append(ThreadPoolExecutor( max_workers        = 1
+                                                      , thread_name_prefix = f'circus-{len(self.ops)}' ))
+                self.sizing.append(None)
+                self.sims.append(0)
+                self.epochs.append(0)
+                self.current.append(None)
+                self.started.append(0.0)
+                self.load.append(0)
+                self.ops.append(op)
+
+    def stats(self) -> dict[str, int]:
+        """
+        Lifecycle counters of all sessions.
+        """
+        with self.stats_lock:
+            return { 'simulations': self.simulations
+                   , 'respawns':    self.respawns
+                   , 'recycles':    self.recycles }
+
+    def respawn(self, idx: int) -> None:
+        """
+        Re-create session `idx` from `config` and replay its last sizing.
+        Must be called from the worker owning the session.
+        """
+        ckt_cfg, pdk_cfg, netlist = self.config
+        try:
+            self.simulator.stop(self.ops[idx])
+        except Exception:
+            pass
+        self.ops[idx]  = self.simulator.make(pdk_cfg, ckt_cfg, netlist)
+        self.sims[idx] = 0
+        with self.stats_lock:
+            self.respawns += 1
+        if self.sizing[idx]:
+            self.simulator.set_parameters(self.ops[idx], self.sizing[idx])
+
+    def kill(self, idx: int, after: float = 0.0) -> Optional[Future]:
+        """
+        Give up on the call session `idx` is running, if it has been running
+        for more than `after` seconds, e.g. because it hangs. The call fails
+        with a `TimeoutError` and the session is stopped and re-created on a
+        fresh worker, see `respawn`. Queued calls move to the new worker and
+        run once it is ready. Returns the future of the respawn, or `None` if
+        nothing was killed. Does nothing without `config`.
+        """
+        running = self.current[idx]
+        if self.config is None or running is None or running.done() or \
+                time.monotonic() - self.started[idx] < after:
+            return None
+        with self.load_lock:
+            self.epochs[idx] += 1
+            hung              = self.workers[idx]
+            self.workers[idx] = ThreadPoolExecutor( max_workers        = 1
+                                                  , thread_name_prefix = f'circus-{idx}' )
+            future            = self.workers[idx].submit(self.respawn, idx)
+        settle(running, exception = TimeoutError(f'Session {idx} was killed.'))
+        hung.shutdown(wait = False, cancel_futures = True)
+        return self.track(idx, future)
+
+    def close(self) -> None:
+        """
+        Shut down all workers. Sessions are not stopped.
+        """
+        if self.recycler.is_alive():
+            self.recycling.put(None)
+            self.recycler.join()
+        for worker in self.workers:
+            worker.shutdown(wait = True)
+
+def serve_connection( conn: Connection, pool: SessionPool
+                    , keep_sessions: bool = False ) -> None:
+    """
+    Serve requests `(req, idx, cmd, args)` received through `conn` on the
+    sessions in `pool`, until `None` is received or the peer hangs up. Sends
+    `(len(pool), pool.spec)` first and replies with `(req, ok, result)` as
+    soon as a request is done, which may be out of order. With
+    `keep_sessions`, requests to stop sessions are ignored.
+    """
+    lock = threading.Lock()
+
+    def reply(req: int, future: Future) -> None:
+        err = future.exception()
+        msg = (req, True, pack(future.result())) if err is None else \
+              (req, False, err)
+        with lock:
+            try:
+                conn.send(msg)
+            except (EOFError, OSError):
+                pass
+            except Exception as exc:
+                conn.send((req, False, RuntimeError(repr(exc))))
+
+    conn.send((len(pool), pool.spec))
+
+    while True:
+        try:
+            msg = conn.recv()
+        except (EOFError, OSError):
+            break
+        if msg is None:
+            break
+        req, idx, cmd, args = msg
+        if (keep_sessions and cmd == 'stop') or idx is None:
+            future = settled(pool.stats() if cmd == 'stats' else False)
+        elif cmd == 'kill':
+            future = pool.kill(idx, *map(unpack, args)) or settled(False)
+        else:
+            future = pool.submit(idx, cmd, *map(unpack, args))
+        future.add_done_callback(lambda f, r = req: reply(r, f))
+
+def _serve_shard( conn: Connection, ckt_cfg: str, pdk_cfg: str
+                , netlist: str, num: int, simulator: Simulator
+                , recycle_after: int, max_rss: int ) -> None:
+    """
+    Worker process of a `ProcessPool` shard, hosting `num` sessions.
+    """
+    pool = SessionPool( make_ops(ckt_cfg, pdk_cfg, netlist, num, simulator)
+                      , simulator, (ckt_cfg, pdk_cfg, netlist)
+                      , recycle_after, max_rss )
+    serve_connection(conn, pool)
+    pool.close()
+    conn.close()
+
+def serve( address: Tuple[str, int], ckt_cfg: str, pdk_cfg: str, netlist: str
+         , num: int, authkey: bytes = None, simulator: Simulator = SERAFIN
+         , recycle_after: int = None, max_rss: int = None ) -> None:
+    """
+    Evaluation worker daemon for the 'remote' backend. Hosts `num` sessions
+    and serves one client at a time on `address`, forever. Further clients are
+    refused with a `ConnectionRefusedError`, if one is still connected after a
+    second. Sessions
+    outlive clients, i.e. a client closing its pool does not stop them.
+    Arguments:
+        - `address`:   `(host, port)` to listen on.
+        - `authkey`:   Shared secret clients must know, defaults to
+                       `$CIRCUS_AUTHKEY`. Required.
+        - `simulator`: Simulator commands, default `SERAFIN`.
+        - `recycle_after`, `max_rss`: Session recycling, see `SessionPool`.
+    """
+    authkey = authkey or AUTHKEY
+
+    if authkey is None:
+        raise ValueError( f'Refusing to listen on {address[0]} without a shared '
+                           'secret, set $CIRCUS_AUTHKEY on workers and clients.' )
+
+    pool    = SessionPool( make_ops(ckt_cfg, pdk_cfg, netlist, num, simulator)
+                         , simulator, (ckt_cfg, pdk_cfg, netlist)
+                         , recycle_after, max_rss )
+    busy    = threading.Lock()
+
+    def client(conn: Connection) -> None:
+        with conn:
+            if not busy.acquire(timeout = 1.0):
+                conn.send(ConnectionRefusedError( f'Worker {address[0]}:{address[1]} '
+                                                   'is serving another client.' ))
+                return
+            try:
+                serve_connection(conn, pool, keep_sessions = True)
+            finally:
+                busy.release()
+
+    with Listener(address, authkey = authkey) as listener:
+        while True:
+            try:
+                conn = listener.accept()
+            except (AuthenticationError, EOFError, OSError):
+                continue
+            threading.Thread(target = client, args = (conn,), daemon = True).start()
+
+class ConnectionPool(BasePool):
+    """
+    Sessions hosted behind connections served by `serve_connection`. Session
+    indices are assigned to connections in order. Same interface as
+    `SessionPool`.
+    """
+    def __init__(self, conns: Iterable[Connection], num: int):
+        """
+        Construct a connection pool.
+        Arguments:
+            - `conns`: Connections to session hosts.
+            - `num`:   Number of sessions required. Hosts are used in order
+                       until `num` sessions are covered.
+        """
+        hosted        = [ conn.recv() for conn in conns ]
+        refused       = [ h for h in hosted if isinstance(h, Exception) ]
+
+        if refused:
+            for conn in conns:
+                conn.close()
+            raise refused[0]
+
+        available     = sum(n for n,_ in hosted)
+
+        if available < num:
+            for conn in conns:
+                conn.close()
+            raise ValueError( f'Only {available} sessions available, '
+                              f'but {num} are required.' )
+
+        sizes         = np.diff(np.minimum(np.cumsum([0] + [n for n,_ in hosted]), num))
+
+        for conn,size in zip(conns, sizes):
+            if size == 0:
+                conn.send(None)
+                conn.close()
+
+        self.num       = num
+        self.spec      = hosted[0][1]
+        self.conns     = [ c for c,n in zip(conns, sizes) if n > 0 ]
+        self.index     = [ (s,i) for s,n in enumerate(sizes[sizes > 0])
+                                 for i in range(n) ]
+        self.pending   = {}
+        self.dead      = set()
+        self.requests  = count()
+        self.lock      = threading.Lock()
+        self.load      = [ 0 for _ in range(num) ]
+        self.load_lock = threading.Lock()
+
+        self.receivers = [ threading.Thread( target = self._receive
+                                           , args   = (shard, conn)
+                                           , daemon = True )
+                           for shard,conn in enumerate(self.conns) ]
+        for receiver in self.receivers:
+            receiver.start()
+
+    def __len__(self) -> int:
+        return self.num
+
+    def _receive(self, shard: int, conn: Connection) -> None:
+        while True:
+            try:
+                req, ok, res = conn.recv()
+            except (EOFError, OSError):
+                break
+            with self.lock:
+                _,future = self.pending.pop(req)
+            if ok:
+                future.set_result(unpack(res))
+            else:
+                future.set_exception(res)
+        self._hang_up(shard)
+
+    def _hang_up(self, shard: int) -> None:
+        """
+        Mark the connection to `shard` as dead and fail all its pending
+        requests with a `ConnectionError`.
+        """
+        with self.lock:
+            self.dead.add(shard)
+            lost = [ r for r,(s,_) in self.pending.items() if s == shard ]
+            lost = [ self.pending.pop(r)[1] for r in lost ]
+        for future in lost:
+            settle(future, exception = ConnectionError( f'Lost connection to '
+                                                        f'session host {shard}.' ))
+
+    def _request( self, shard: int, local: Optional[int], cmd: str, args: tuple
+                , future: Future ) -> Future:
+        with self.lock:
+            alive = shard not in self.dead
+            if alive:
+                req               = next(self.requests)
+                self.pending[req] = (shard, future)
+                try:
+                    self.conns[shard].send((req, local, cmd, tuple(map(pack, args))))
+                except (EOFError, OSError):
+                    alive = False
+        if not alive:
+            self._hang_up(shard)
+            settle(future, exception = ConnectionError( f'Lost connection to '
+                                                        f'session host {shard}.' ))
+        return future
+
+    def submit(self, idx: int, cmd: str, *args) -> Future:
+        """
+        Call simulator command `cmd` with `(op, *args)` on session `idx`.
+        """
+        shard, local = self.index[idx]
+        return self._request(shard, local, cmd, args, self.track(idx, Future()))
+
+    def kill(self, idx: int, after: float = 0.0) -> Future:
+        """
+        Give up on the call session `idx` is running, see `SessionPool.kill`.
+        """
+        return self.submit(idx, 'kill', after)
+
+    def stats(self) -> dict[str, int]:
+        """
+        Lifecycle counters of all sessions, summed over all hosts.
+        """
+        futures = [ self._request(s, None, 'stats', (), Future())
+                    for s,_ in enumerate(self.conns) ]
+        return { k: sum(f.result()[k] for f in futures)
+                 for k in futures[0].result().keys() }
+
+    def close(self) -> None:
+        """
+        Hang up on all session hosts.
+        """
+        for conn in self.conns:
+            try:
+                conn.send(None)
+            except (EOFError, OSError):
+                pass
+            conn.close()
+
+class ProcessPool(ConnectionPool):
+    """
+    Pool of serafin sessions sharded across worker processes, s.t. parsing
+    and post processing of results is not serialized by the GIL. Sizings and
+    results cross process boundaries as packed numpy arrays.
+    """
+    def __init__( self, ckt_cfg: str, pdk_cfg: str, netlist: str, num: int
+                , num_shards: int = None, simulator: Simulator = SERAFIN
+                , recycle_after: int = None, max_rss: int = None ):
+        """
+        Construct a process pool.
+        Arguments:
+            - `ckt_cfg`:    path to `ckt_id.yml`
+            - `pdk_cfg`:    path to `pdk_id.yml`
+            - `netlist`:    path to `ckt_id.scs`
+            - `num`:        Number of sessions ∈ [1 .. ∞).
+            - `num_shards`: Number of worker processes the sessions are
+                            distributed across, defaults to one per session,
+                            but not more than available cores.
+            - `simulator`:  Simulator commands, default `SERAFIN`.
+            - `recycle_after`, `max_rss`: Session recycling, see `SessionPool`.
+        """
+        ctx        = mp.get_context('spawn')
+        shards     = min(num, num_shards or os.cpu_count() or 1)
+        sizes      = [ len(s) for s in np.array_split(np.arange(num), shards) ]
+        conns      = []
+        self.procs = []
+
+        for n in sizes:
+            parent, child = ctx.Pipe()
+            proc          = ctx.Process( target = _serve_shard
+                                       , args   = ( child, ckt_cfg, pdk_cfg
+                                                  , netlist, n, simulator
+                                                  , recycle_after, max_rss )
+                                       , daemon = True )
+            proc.start()
+            child.close()
+            conns.append(parent)
+            self.procs.append(proc)
+
+        super().__init__(conns, num)
+
+    def close(self) -> None:
+        """
+        Shut down all worker processes.
+        """
+        super().close()
+        for proc in self.procs:
+            proc.join()
+
+class MultiplexPool(BasePool):
+    """
+    Multiplexes `num` environments over the fewer sessions of a wrapped pool,
+    e.g. when simulator licenses are limited. Index of the environment takes
+    the place of the session index. Commands are queued and run on whichever
+    session is free next. Parameters set for an environment are only recorded
+    and replayed with `set_parameters` on the chosen session before every
+    other command, together with the sizing last evaluated for it. Sessions
+    are stopped once all environments have been stopped.
+    """
+    def __init__( self, pool: BasePool, num: int
+                , dispatch_lock: threading.Lock = None ):
+        """
+        Construct a multiplexing pool.
+        Arguments:
+            - `pool`:          Session pool to wrap.
+            - `num`:           Number of environments ∈ [1 .. ∞).
+            - `dispatch_lock`: Lock shared by all multiplexers of `pool`, s.t.
+                               replaying parameters and the command are
+                               queued back to back on a session.
+        """
+        self.pool      = pool
+        self.num       = num
+        self.dispatch  = dispatch_lock or threading.Lock()
+        self.spec      = pool.spec
+        self.state     = [ {} for _ in range(num) ]
+        self.stopped   = set()
+        self.free      = list(range(len(pool)))
+        self.queue     = queue.SimpleQueue()
+        self.lock      = threading.Lock()
+        self.load      = [ 0 for _ in range(num) ]
+        self.load_lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return self.num
+
+    def stats(self) -> dict[str, int]:
+        return self.pool.stats()
 
-def random_sizing( ops: Iterable[sf.OperationalAmplifier] ) -> pd.DataFrame:
+    def submit(self, idx: int, cmd: str, *args) -> Future:
+        """
+        Queue simulator command `cmd` with `(op, *args)` for environment `idx`.
+        """
+        future = self.track(idx, Future())
+
+        if cmd == 'set_parameters':
+            self.state[idx] |= dict(args[0])
+            future.set_result(True)
+        elif cmd == 'stop':
+            with self.lock:
+                self.stopped.add(idx)
+                last = len(self.stopped) == self.num
+            future.set_result( all( f.result() for f in
+                                    [ self.pool.submit(i, 'stop')
+                                      for i in range(len(self.pool)) ] )
+                               if last else True )
+        else:
+            with self.lock:
+                session = self.free.pop(0) if self.free else None
+                if session is None:
+                    self.queue.put((idx, cmd, args, future))
+            if session is not None:
+                self._dispatch(session, idx, cmd, args, future)
+
+        return future
+
+    def _dispatch( self, session: int, idx: int, cmd: str, args: tuple
+                 , future: Future ) -> None:
+        if cmd == 'evaluate' and args:
+            self.state[idx] |= args[0].iloc[0].to_dict()
+
+        with self.dispatch:
+            prepare = self.pool.submit(session, 'set_parameters', dict(self.state[idx])) \
+                        if self.state[idx] else None
+            attempt = self.pool.submit(session, cmd, *args)
+
+        def done(attempt: Future) -> None:
+            err = (prepare and prepare.exception()) or attempt.exception()
+            if err is None:
+                future.sim_timeout = getattr(attempt, 'sim_timeout', False)
+                future.set_result(attempt.result())
+            else:
+                future.set_exception(err)
+            with self.lock:
+                job = None if self.queue.empty() else self.queue.get()
+                if job is None:
+                    self.free.append(session)
+            if job is not None:
+                self._dispatch(session, *job)
+
+        attempt.add_done_callback(done)
+
+    def close(self) -> None:
+        """
+        Close the wrapped pool.
+        """
+        self.pool.close()
+
+def parse_address(address: Union[str, Tuple[str, int]]) -> Tuple[str, int]:
+    """
+    Turn `'host:port'` into `(host, port)`.
+    """
+    if isinstance(address, str):
+        host, port = address.rsplit(':', 1)
+        address    = (host, int(port))
+    return tuple(address)
+
+class RemotePool(ConnectionPool):
+    """
+    Pool of serafin sessions hosted by evaluation worker daemons, see `serve`,
+    possibly spread across several machines. A batch is spread across workers
+    in the given order and results are reassembled in env order.
+    """
+    def __init__( self, workers: Iterable[Union[str, Tuple[str, int]]]
+                , num: int, authkey: bytes = None ):
+        """
+        Construct a remote pool.
+        Arguments:
+            - `workers`: Worker addresses as `'host:port'` or `(host, port)`.
+            - `num`:     Number of sessions ∈ [1 .. ∞).
+            - `authkey`: Shared secret of the workers, defaults to
+                         `$CIRCUS_AUTHKEY`, see `serve`.
+        """
+        authkey = authkey or AUTHKEY
+        if authkey is None:
+            raise ValueError( 'No shared secret for the workers, set '
+                              '$CIRCUS_AUTHKEY on workers and clients.' )
+        conns   = [ Client(parse_address(w), authkey = authkey) for w in workers ]
+        super().__init__(conns, num)
+
+def forward(source: Future, target: Future) -> None:
+    """
+    Resolve `target` with the outcome of `source`, once it is done.
+    """
+    def resolve(source: Future) -> None:
+        target.sim_timeout = getattr(source, 'sim_timeout', False)
+        target.approximate = getattr(source, 'approximate', False)
+        if source.exception() is None:
+            target.set_result(source.result())
+        else:
+            target.set_exception(source.exception())
+    source.add_done_callback(resolve)
+
+class LazyPool(BasePool):
+    """
+    Creates a pool in the background, s.t. its `spec` can be used before any
+    session is up. Commands submitted before the pool is ready are queued and
+    submitted in order once it is.
+    """
+    def __init__(self, make: Callable[[], BasePool], spec: OpSpec, num: int):
+        """
+        Construct a lazy pool.
+        Arguments:
+            - `make`: Creates the actual pool.
+            - `spec`: Spec of the sessions the pool will have.
+            - `num`:  Number of sessions the pool will have.
+        """
+        self.spec      = spec
+        self.num       = num
+        self.ready     = Future()
+        self.lock      = threading.RLock()
+        self.load      = [ 0 for _ in range(num) ]
+        self.load_lock = threading.Lock()
+        self.maker     = threading.Thread( target = self._make, args = (make,)
+                                         , daemon = True )
+        self.maker.start()
+
+    def _make(self, make: Callable[[], BasePool]) -> None:
+        try:
+            pool = make()
+        except Exception as exc:
+            with self.lock:
+                self.ready.set_exception(exc)
+            return
+        with self.lock:
+            self.ready.set_result(pool)
+
+    @property
+    def pool(self) -> BasePool:
+        """
+        The actual pool, waits until it is ready.
+        """
+        return self.ready.result()
+
+    def __len__(self) -> int:
+        return self.num
+
+    def idle(self) -> list[int]:
+        return self.pool.idle() if self.ready.done() else []
+
+    def stats(self) -> dict[str, int]:
+        return self.pool.stats()
+
+    def submit(self, idx: int, cmd: str, *args) -> Future:
+        """
+        Same as `submit` of the actual pool, but doesn't wait for it.
+        """
+        with self.lock:
+            if self.ready.done():
+                return self.pool.submit(idx, cmd, *args)
+
+            future = self.track(idx, Future())
+
+            def run(ready: Future) -> None:
+                if ready.exception() is None:
+                    forward(ready.result().submit(idx, cmd, *args), future)
+                else:
+                    future.set_exception(ready.exception())
+
+            self.ready.add_done_callback(run)
+            return future
+
+    def close(self) -> None:
+        """
+        Close the actual pool.
+        """
+        self.pool.close()
+
+class Watchdog:
+    """
+    A single thread calling callbacks once their deadline has passed.
+    Exceptions raised by callbacks are logged, s.t. later deadlines still
+    fire.
+    """
+    def __init__(self):
+        self.queue   = []
+        self.order   = count()
+        self.cond    = threading.Condition()
+        self.running = True
+        self.thread  = threading.Thread(target = self._run, daemon = True)
+        self.thread.start()
+
+    def schedule(self, delay: float, fn: Callable) -> None:
+        """
+        Call `fn()` in `delay` seconds.
+        """
+        with self.cond:
+            heapq.heappush( self.queue
+                          , (time.monotonic() + delay, next(self.order), fn) )
+            self.cond.notify()
+
+    def _run(self) -> None:
+        while True:
+            with self.cond:
+                while self.running and ( not self.queue or
+                                         self.queue[0][0] > time.monotonic() ):
+                    self.cond.wait( self.queue[0][0] - time.monotonic()
+                                    if self.queue else None )
+                if not self.running:
+                    break
+                _,_,fn = heapq.heappop(self.queue)
+            try:
+                fn()
+            except Exception:
+                logger.exception('Watchdog callback failed.')
+
+    def stop(self) -> None:
+        """
+        Stop the watchdog, pending callbacks are dropped.
+        """
+        with self.cond:
+            self.running = False
+            self.cond.notify()
+        self.thread.join()
+
+class SpeculativePool(BasePool):
+    """
+    Wraps a session pool and puts a deadline on every evaluation. When it
+    passes, the same sizing is resubmitted to an idle session and the first
+    result to arrive wins. If both attempts miss their deadline, the result
+    is a row of NaNs and the future is flagged with `sim_timeout = True`, see
+    `timed_out`. The session that helped out keeps the parameters of the
+    speculative sizing. Sessions still busy with an attempt after both
+    deadlines are killed and re-created, if the wrapped pool supports it, see
+    `SessionPool.kill`, s.t. a hung simulation does not block later ones.
+    """
+    def __init__(self, pool: BasePool, timeout: float):
+        """
+        Construct a speculative pool.
+        Arguments:
+            - `pool`:    Session pool to wrap.
+            - `timeout`: Deadline for each attempt in seconds.
+        """
+        self.pool     = pool
+        self.spec     = pool.spec
+        self.timeout  = timeout
+        self.columns  = []
+        self.watchdog = Watchdog()
+
+    def __len__(self) -> int:
+        return len(self.pool)
+
+    def idle(self) -> list[int]:
+        return self.pool.idle()
+
+    def stats(self) -> dict[str, int]:
+        return self.pool.stats()
+
+    def submit(self, idx: int, cmd: str, *args) -> Future:
+        """
+        Same as `submit` of the wrapped pool, but evaluations have a deadline.
+        """
+        if cmd != 'evaluate':
+            return self.pool.submit(idx, cmd, *args)
+
+        result   = Future()
+        attempts = []
+        lock     = threading.RLock()
+
+        def resolve(attempt: Future) -> None:
+            with lock:
+                if result.done():
+                    return
+                if attempt.exception() is None:
+                    self.columns = list(attempt.result().columns)
+                    result.set_result(attempt.result())
+                elif all(a.done() for _,a in attempts):
+                    result.set_exception(attempt.exception())
+
+        def run(session: int) -> None:
+            attempt = self.pool.submit(session, cmd, *args)
+            attempts.append((session, attempt))
+            attempt.add_done_callback(resolve)
+
+        def fail() -> None:
+            with lock:
+                if not result.done():
+                    result.sim_timeout = True
+                    result.set_result(pd.DataFrame( np.nan, index = [0]
+                                                  , columns = self.columns ))
+                hung = [ s for s,a in attempts if not a.done() ]
+            kill = getattr(self.pool, 'kill', None)
+            for session in hung if kill else []:
+                kill(session, self.timeout)
+
+        def speculate() -> None:
+            with lock:
+                helpers = [ i for i in self.pool.idle() if i != idx ]
+                if helpers and not result.done():
+                    run(helpers[0])
+            self.watchdog.schedule(self.timeout, fail)
+
+        with lock:
+            run(idx)
+        self.watchdog.schedule(self.timeout, speculate)
+
+        return result
+
+    def close(self) -> None:
+        """
+        Stop the watchdog and close the wrapped pool.
+        """
+        self.watchdog.stop()
+        self.pool.close()
+
+class Lease(MultiplexPool):
+    """
+    Environments multiplexed over the sessions of a pool shared through a
+    `SessionRegistry`. Sessions are not stopped, closing the lease returns it
+    to the registry.
     """
-    Get a random sizing for all `ops`. Row index corresponds to index in `ops`.
+    def __init__( self, registry: 'SessionRegistry', config: Tuple[str, str, str]
+                , pool: BasePool, num: int, dispatch_lock: threading.Lock ):
+        super().__init__(pool, num, dispatch_lock)
+        self.registry = registry
+        self.config   = config
+
+    def submit(self, idx: int, cmd: str, *args) -> Future:
+        if cmd != 'stop':
+            return super().submit(idx, cmd, *args)
+        future = self.track(idx, Future())
+        future.set_result(True)
+        return future
+
+    def close(self) -> None:
+        """
+        Return the lease to the registry.
+        """
+        if isinstance(self.pool, SpeculativePool):
+            self.pool.watchdog.stop()
+        self.registry.release(self.config)
+
+class SessionRegistry:
+    """
+    Process wide registry of session pools, one per configuration, shared by
+    all environments through reference counted leases. Sessions outlive
+    their leases, s.t. environments created later don't have to wait for new
+    sessions, until they are stopped with `stop`.
+    """
+    def __init__(self):
+        self.pools = {}
+        self.lock  = threading.Lock()
+
+    def lease( self, ckt_cfg: str, pdk_cfg: str, netlist: str, num: int
+             , num_sessions: int = None, sim_timeout: float = None
+             , recycle_after: int = None, max_rss: int = None
+             , simulator: Simulator = SERAFIN ) -> Lease:
+        """
+        Lease `num` environments on the sessions for the given configuration,
+        which are created or extended to `num_sessions` if necessary. Session
+        recycling is configured by the first lease.
+        """
+        config   = (ckt_cfg, pdk_cfg, netlist)
+        sessions = min(num_sessions or num, num)
+        with self.lock:
+            pool, leases, lock = self.pools.get(config, (None, 0, threading.Lock()))
+            if pool is None:
+                pool = SessionPool( make_ops(*config, sessions, simulator)
+                                  , simulator, config, recycle_after, max_rss )
+            elif len(pool) < sessions:
+                pool.extend(make_ops(*config, sessions - len(pool), simulator))
+            self.pools[config] = (pool, leases + 1, lock)
+        inner = SpeculativePool(pool, sim_timeout) if sim_timeout else pool
+        return Lease(self, config, inner, num, lock)
+
+    def release(self, config: Tuple[str, str, str]) -> None:
+        """
+        Return a lease for `config`.
+        """
+        with self.lock:
+            pool, leases, lock  = self.pools[config]
+            self.pools[config]  = (pool, max(leases - 1, 0), lock)
+
+    def leases(self, config: Tuple[str, str, str]) -> int:
+        """
+        Number of leases for `config`.
+        """
+        with self.lock:
+            return self.pools.get(config, (None, 0, None))[1]
+
+    def stop(self, leased: bool = False) -> None:
+        """
+        Stop the sessions of all configurations without leases, or all of
+        them if `leased`.
+        """
+        with self.lock:
+            stopped = [ c for c,(_,n,_) in self.pools.items() if leased or n == 0 ]
+            pools   = [ self.pools.pop(c)[0] for c in stopped ]
+        for pool in pools:
+            pool.close()
+            for op in pool.ops:
+                try:
+                    pool.simulator.stop(op)
+                except Exception:
+                    pass
+
+REGISTRY = SessionRegistry()
+atexit.register(REGISTRY.stop, True)
+
+def make_pool( backend: str, ckt_cfg: str, pdk_cfg: str, netlist: str
+             , num: int, num_shards: int = None
+             , workers: Iterable[Union[str, Tuple[str, int]]] = None
+             , recycle_after: int = None, max_rss: int = None
+             , sim_timeout: float = None, num_sessions: int = None
+             , shared: bool = False ) -> BasePool:
+    """
+    Create a pool of `num` sessions, or `num` environments multiplexed over
+    `num_sessions` sessions.
+    Arguments:
+        - `backend`:    'thread' for sessions in this process,
+                        'process' for sessions sharded across worker processes,
+                        'remote' for sessions hosted by worker daemons.
+        - `num_shards`: Number of worker processes for the 'process' backend.
+        - `workers`:    Worker addresses for the 'remote' backend.
+        - `recycle_after`, `max_rss`: Session recycling, see `SessionPool`.
+                        Configured on the daemon for the 'remote' backend.
+        - `sim_timeout`: Deadline per simulation, see `SpeculativePool`.
+        - `num_sessions`: Number of sessions if less than `num`, see
+                        `MultiplexPool`.
+        - `shared`:     Lease sessions shared with other pools of the same
+                        configuration from `REGISTRY`, 'thread' backend only.
+    """
+    sessions = min(num_sessions or num, num)
+    if shared and backend == 'thread':
+        return REGISTRY.lease( ckt_cfg, pdk_cfg, netlist, num, num_sessions
+                             , sim_timeout, recycle_after, max_rss )
+    elif shared:
+        raise ValueError(f'Shared sessions are not available for {backend} backend.')
+    if backend == 'thread':
+        pool = SessionPool( make_ops(ckt_cfg, pdk_cfg, netlist, sessions)
+                          , config        = (ckt_cfg, pdk_cfg, netlist)
+                          , recycle_after = recycle_after
+                          , max_rss       = max_rss )
+    elif backend == 'process':
+        pool = ProcessPool( ckt_cfg, pdk_cfg, netlist, sessions, num_shards
+                          , recycle_after = recycle_after, max_rss = max_rss )
+    elif backend == 'remote':
+        pool = RemotePool(workers or [], sessions)
+    else:
+        raise ValueError(f'Simulation backend {backend} not available.')
+    pool = SpeculativePool(pool, sim_timeout) if sim_timeout else pool
+    pool = MultiplexPool(pool, num) if sessions < num else pool
+    return pool
+
+def timed_out(futures: Iterable[Future]) -> list[bool]:
+    """
+    Which of the evaluation `futures` missed their deadline, see
+    `SpeculativePool`.
+    """
+    return [ getattr(f, 'sim_timeout', False) for f in futures ]
+
+def stop_sessions(pool: SessionPool, idxs: Iterable[int]) -> None:
+    """
+    Stop the sessions with the given indices in `pool`.
+    """
+    futures = [ pool.submit(i, 'stop') for i in idxs ]
+    _       = [ f.result() for f in futures ]
+
+def set_parameters( pool: SessionPool, sizing: Iterable[dict[str,float]]
+                  ) -> bool:
+    """
+    Set sizing parameters. Index in `sizing` list corresponds to index of the
+    session in `pool`.
+    """
+    return all(pool.map('set_parameters', sizing))
+
+def current_sizing(pool: SessionPool) -> pd.DataFrame:
+    """
+    Retrieve the current sizing of all sessions in `pool`. Row index
+    corresponds to index of the session in `pool`.
+    """
+    return pd.concat(pool.map('current_sizing'))
+
+def random_sizing(pool: SessionPool, idxs: Iterable[int] = None) -> pd.DataFrame:
+    """
+    Get a random sizing for all sessions in `pool`, or only those in `idxs`.
+    Row index corresponds to index of the session (in `idxs`).
     """
-    num = len(ops)
+    num = len(pool) if idxs is None else len(idxs)
     mul = pd.DataFrame.from_dict({ k: num * [m]
-                                   for k,m in ops[0].geom_init.items()
+                                   for k,m in pool.spec.geom_init.items()
                                    if k.startswith('M') }
                                 ).reset_index(drop = True)
 
-    wls = [ c for c in list(ops[0].geom_init.keys())
+    wls = [ c for c in list(pool.spec.geom_init.keys())
               if c not in list(mul.columns) ]
 
-    with Pool(num) as pl:
-        siz = pd.concat(pl.map(sf.random_sizing, ops))[wls].reset_index(drop = True)
+    siz = pd.concat(pool.map('random_sizing', idxs = idxs)
+                   )[wls].reset_index(drop = True)
 
     sizing = pd.concat([siz, mul], axis = 1)
 
     return sizing
 
-def evaluate( ops: Iterable[sf.OperationalAmplifier], sizing: pd.DataFrame
-            ) -> pd.DataFrame:
+def mirror(future: Future, columns: list[str] = None) -> Future:
     """
-    Evaluate all `ops` in parallel. Row index of `sizing` must correspond with
-    index in `ops`.
+    A future with a copy of the result of `future`, once it is done, only
+    containing `columns` if given.
     """
-    num     = len(ops)
-    sizings = [row.to_frame().transpose() for _,row in sizing.iterrows()]
-    with Pool(num) as pl:
-        results = pd.concat(pl.starmap(sf.evaluate, zip(ops, sizings)))
-    return results
+    copy = Future()
+
+    def resolve(original: Future) -> None:
+        copy.sim_timeout = getattr(original, 'sim_timeout', False)
+        copy.approximate = getattr(original, 'approximate', False)
+        if original.exception() is None:
+            result = original.result()
+            copy.set_result( result.copy() if columns is None else
+                             project(result, columns) )
+        else:
+            copy.set_exception(original.exception())
+
+    future.add_done_callback(resolve)
+    return copy
+
+def evaluate_async( pool: SessionPool, sizing: pd.DataFrame
+                  , idxs: Iterable[int] = None, columns: list[str] = None
+                  ) -> list[Future]:
+    """
+    Submit an evaluation of all sessions in `pool`, or only those in `idxs`,
+    and return right away. Row index of `sizing` must correspond with index
+    of the session (in `idxs`). Collect the results with `gather`. If
+    `columns` is given, only those are extracted from the results, see
+    `project`.
+
+    Identical rows are only simulated once, on the first session they belong
+    to, the other sessions just get the sizing set and a copy of the result.
+    """
+    idxs    = range(len(sizing)) if idxs is None else idxs
+    args    = () if columns is None else (columns,)
+    rows    = np.ascontiguousarray(sizing.to_numpy())
+    unique  = {}
+    futures = []
+    for i,(_,row),key in zip(idxs, sizing.iterrows(), map(bytes, rows)):
+        if key in unique:
+            _ = pool.submit(i, 'set_parameters', row.to_dict())
+            futures.append(mirror(unique[key]))
+        else:
+            unique[key] = pool.submit(i, 'evaluate', row.to_frame().transpose(), *args)
+            futures.append(unique[key])
+    return futures
+
+def gather(futures: Iterable[Future]) -> pd.DataFrame:
+    """
+    Block until all `futures` obtained from `evaluate_async` are done.
+    """
+    return pd.concat([ f.result() for f in futures ])
+
+def evaluate( pool: SessionPool, sizing: pd.DataFrame
+            , columns: list[str] = None ) -> pd.DataFrame:
+    """
+    Evaluate all sessions in `pool` in parallel. Row index of `sizing` must
+    correspond with index of the session in `pool`. Results only contain
+    `columns`, if given.
+    """
+    return gather(evaluate_async(pool, sizing, columns = columns))
+
+def evaluate_batch( pool: SessionPool, sizing: pd.DataFrame
+                  , columns: list[str] = None ) -> pd.DataFrame:
+    """
+    Evaluate any number of sizings, by streaming the rows of `sizing` through
+    `pool`, each on whichever session is free next. Row index of the result
+    corresponds to the row of `sizing`. Results only contain `columns`, if
+    given.
+    """
+    args    = () if columns is None else (columns,)
+    free    = queue.SimpleQueue()
+    _       = [ free.put(i) for i in range(len(pool)) ]
+    futures = []
+    for _,row in sizing.iterrows():
+        idx    = free.get()
+        future = pool.submit(idx, 'evaluate', row.to_frame().transpose(), *args)
+        future.add_done_callback(lambda _, i = idx: free.put(i))
+        futures.append(future)
+    return gather(futures).reset_index(drop = True)
+
+class ResetBuffer:
+    """
+    Bounded queue of precomputed reset states `(sizing, result)`, filled in
+    the background by evaluating random sizings on idle sessions, one at a
+    time.
+    """
+    def __init__( self, pool: SessionPool, size: int
+                , interval: float = 0.05, columns: list[str] = None ):
+        """
+        Construct a reset buffer and start filling it.
+        Arguments:
+            - `pool`:     Session pool.
+            - `size`:     Maximum number of precomputed states.
+            - `interval`: Seconds to wait when no session is idle.
+            - `columns`:  Result columns to keep, all if `None`.
+        """
+        self.pool     = pool
+        self.interval = interval
+        self.args     = () if columns is None else (columns,)
+        self.states   = queue.Queue(size)
+        self.stopped  = threading.Event()
+        self.filler   = threading.Thread(target = self._fill, daemon = True)
+        self.filler.start()
+
+    def __len__(self) -> int:
+        return self.states.qsize()
+
+    def _fill(self) -> None:
+        while not self.stopped.is_set():
+            idle = self.pool.idle()
+            if self.states.full() or not idle:
+                self.stopped.wait(self.interval)
+                continue
+            idx    = idle[0]
+            try:
+                sizing = random_sizing(self.pool, [idx])
+                future = self.pool.submit(idx, 'evaluate', sizing, *self.args)
+                result = future.result()
+            except Exception:
+                self.stopped.wait(self.interval)
+                continue
+            if not timed_out([future])[0]:
+                self.states.put((sizing, result))
+
+    def take(self, num: int) -> list[Tuple[pd.DataFrame, pd.DataFrame]]:
+        """
+        Up to `num` precomputed states that are ready, without waiting.
+        """
+        states = []
+        while len(states) < num:
+            try:
+                states.append(self.states.get_nowait())
+            except queue.Empty:
+                break
+        return states
+
+    def close(self) -> None:
+        """
+        Stop filling the buffer.
+        """
+        self.stopped.set()
+        self.filler.join()
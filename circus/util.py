@@ -12,6 +12,21 @@ import pyspectre as ps
 
 from .trafo import *
 
+def config_paths( ckt_id: str, pdk_id: str, ckt_cfg: str = None
+                , pdk_cfg: str = None, netlist: str = None
+                ) -> Tuple[str, str, str]:
+    """
+    Resolve paths to `ckt_id.yml`, `pdk_id.yml` and the netlist. Paths that
+    are not given or don't exist are searched for in `$CIRCUS_HOME`.
+    """
+    home = os.environ.get('CIRCUS_HOME', os.path.expanduser('~/.circus'))
+    return ( ckt_cfg if ckt_cfg and os.path.isfile(ckt_cfg) else
+                f'{home}/ckt/{ckt_id}.yml'
+           , pdk_cfg if pdk_cfg and os.path.isfile(pdk_cfg) else
+                f'{home}/pdk/{pdk_id}.yml'
+           , netlist if netlist and os.path.isfile(netlist) else
+                f'{home}/pdk/{pdk_id}/{ckt_id}.scs' )
+
 def df_to_dict(df: pd.DataFrame) -> dict[int, dict[str, float]]:
     """ Convert a dataframe to a dictionary """
     return { row.Index: { k: np.nan_to_num(v, nan = 0.0, posinf = 0.0, neginf = 0.0)
@@ -66,6 +81,63 @@ def filter_results( filter_ids: Iterable[str], results: pd.DataFrame
     n2n = partial(np.nan_to_num, nan = 0.0, posinf = 0.0, neginf = 0.0)
     return results[filter_ids].apply(n2n)
 
+class StateTable:
+    """
+    Preallocated state of all environments, one row each, with fixed columns.
+    Rows are updated in place, a `pd.DataFrame` of the table is only built
+    when `frame` is accessed.
+    """
+    def __init__( self, columns: Iterable[str], num: int
+                , dtype: np.dtype = np.float64 ):
+        """
+        Construct a state table filled with NaNs.
+        Arguments:
+            - `columns`: Column names.
+            - `num`:     Number of rows, i.e. environments.
+            - `dtype`:   Data type of all columns.
+        """
+        self.columns = list(columns)
+        self.labels  = pd.Index(self.columns)
+        self.values  = np.full((num, len(self.columns)), np.nan, dtype = dtype)
+        self.cached  = None
+
+    def __len__(self) -> int:
+        return self.values.shape[0]
+
+    def rows(self, frame: pd.DataFrame) -> np.ndarray:
+        """
+        Values of `frame` in the column order of the table, columns missing in
+        `frame` are NaN.
+        """
+        frame = frame if frame.columns.equals(self.labels) else \
+                frame.reindex(columns = self.labels)
+        return frame.to_numpy(dtype = self.values.dtype)
+
+    def update(self, env_ids: Union[Iterable[int], slice], values: np.ndarray) -> None:
+        """
+        Overwrite the rows of `env_ids` with `values`.
+        """
+        self.values[env_ids] = values
+        self.cached          = None
+
+    def update_frames( self, env_ids: Union[Iterable[int], slice]
+                     , frames: Iterable[pd.DataFrame] ) -> None:
+        """
+        Overwrite the rows of `env_ids` with the rows of all `frames` in order.
+        """
+        values = [ self.rows(f) for f in frames ]
+        if values:
+            self.update(env_ids, np.concatenate(values))
+
+    @property
+    def frame(self) -> pd.DataFrame:
+        """
+        Copy of the table as `pd.DataFrame`, built once per update.
+        """
+        if self.cached is None:
+            self.cached = pd.DataFrame(self.values.copy(), columns = self.columns)
+        return self.cached
+
 def geometric_unscaler( constraints: dict[str, dict[str, float]]
                       , geom_params: Iterable[str]
                       ) -> Callable:
@@ -83,17 +155,14 @@ def geometric_unscaler( constraints: dict[str, dict[str, float]]
 
     return (lambda x: x_min + ( ((np.vstack(x) + 1.0) / 2.0) * (x_max - x_min)))
 
-def performance_scaler( ckt_id: str, constraints: dict
-                      , performance_ids: Iterable[str]
-                      ) -> Tuple[Callable, Callable]:
+def performance_masks( ckt_id: str, constraints: dict
+                     , performance_ids: Iterable[str]
+                     ) -> Tuple[ np.ndarray, np.ndarray, np.ndarray
+                               , np.ndarray, np.ndarray ]:
     """
-    Scale/Unscale performance obtained from serafin as specified in the
-    corresponding `trafo` module, s.t. ∈ [-1.0;1.0].
-    Returns a scaler and unscaler funciton:
-        - `scaler   :: np.ndarray -> np.ndarray`
-        - `unscaler :: np.ndarray -> np.ndarray`
-    **Note**: Since the scaling uses log10, it's a destructive operation,
-    unscaling might result in the wrong sign.
+    Which of the given performances are taken absolute, log10 and scaled as
+    specified in the corresponding `trafo` module, and the bounds of the
+    scaled ones. Returns `(abs_msk, log_msk, scl_msk, x_min, x_max)`.
     """
     x_min_d, x_max_d = performance_scale(ckt_id, constraints)
 
@@ -118,10 +187,27 @@ def performance_scaler( ckt_id: str, constraints: dict
     x_max   = np.array([ x_max_d[pp] for pp in performance_ids
                                      if  pp in x_max_d.keys() ])
 
+    return (abs_msk, log_msk, scl_msk, x_min, x_max)
+
+def performance_scaler( ckt_id: str, constraints: dict
+                      , performance_ids: Iterable[str]
+                      ) -> Tuple[Callable, Callable]:
+    """
+    Scale/Unscale performance obtained from serafin as specified in the
+    corresponding `trafo` module, s.t. ∈ [-1.0;1.0].
+    Returns a scaler and unscaler funciton:
+        - `scaler   :: np.ndarray -> np.ndarray`
+        - `unscaler :: np.ndarray -> np.ndarray`
+    **Note**: Since the scaling uses log10, it's a destructive operation,
+    unscaling might result in the wrong sign.
+    """
+    abs_msk, log_msk, scl_msk, x_min, x_max = \
+            performance_masks(ckt_id, constraints, performance_ids)
+
     def scaler(x: np.ndarray) -> np.ndarray:
         a            = (np.abs(x) * abs_msk) + (x * ~abs_msk)
-        l            = (np.log10(a, where = (a * log_msk) > 0.0) * log_msk
-                       ) + (a * ~log_msk)
+        l            = ( np.log10(a, out = a.copy(), where = (a * log_msk) > 0.0)
+                       * log_msk ) + (a * ~log_msk)
         x_           = np.clip(l[:,scl_msk], x_min, x_max)
         y_           = 2.0 * (x_ - x_min) / (x_max - x_min) - 1.0
         y            = x.copy()
@@ -137,3 +223,137 @@ def performance_scaler( ckt_id: str, constraints: dict
         return x
 
     return (scaler, unscaler)
+
+class ColumnScaler:
+    """
+    Compiled counterpart of `performance_scaler` for a fixed number of rows.
+    Selects columns, replaces NaNs and scales in place in preallocated double
+    precision buffers, only the result is copied out as `dtype`, into the
+    output buffer if given.
+    """
+    def __init__( self, ckt_id: str, constraints: dict
+                , performance_ids: Iterable[str], num: int
+                , columns: np.ndarray = None, clean: bool = True
+                , dtype: np.dtype = np.float64, out: np.ndarray = None ):
+        """
+        Construct a column scaler.
+        Arguments:
+            - `ckt_id`:          Circuit ID.
+            - `constraints`:     Constraints obtained from serafin.
+            - `performance_ids`: Performances in output order.
+            - `num`:             Maximum number of rows.
+            - `columns`:         Positions of `performance_ids` in the input
+                                 rows, `None` if they are the same.
+            - `clean`:           Replace NaN and ±inf by 0.0 before scaling.
+            - `dtype`:           Data type of the results.
+            - `out`:             Output buffer of shape [num, len(performance_ids)],
+                                 results are views of it instead of copies.
+        """
+        abs_msk, log_msk, scl_msk, x_min, x_max = \
+                performance_masks(ckt_id, constraints, performance_ids)
+
+        lower           = np.full(len(scl_msk), -np.inf)
+        upper           = np.full(len(scl_msk), np.inf)
+        factor          = np.ones(len(scl_msk))
+        offset          = np.zeros(len(scl_msk))
+        lower[scl_msk]  = x_min
+        upper[scl_msk]  = x_max
+        factor[scl_msk] = 2.0 / (x_max - x_min)
+        offset[scl_msk] = - x_min * factor[scl_msk] - 1.0
+
+        self.columns  = columns
+        self.clean    = clean
+        self.abs_msk  = abs_msk.astype(bool) & scl_msk
+        self.log_msk  = log_msk.astype(bool) & scl_msk
+        self.lower    = lower
+        self.upper    = upper
+        self.factor   = factor
+        self.offset   = offset
+        self.dtype    = np.dtype(dtype)
+        self.limit    = np.finfo(dtype).max
+        self.out      = out
+        self.buffer   = np.empty((num, len(scl_msk)), dtype = np.float64)
+        self.mask     = np.empty((num, len(scl_msk)), dtype = bool)
+
+    def __call__(self, rows: np.ndarray, scale: bool = True) -> np.ndarray:
+        """
+        Selected, cleaned and optionally scaled copy of `rows` as `dtype`, or
+        view of the output buffer.
+        """
+        y = self.buffer[:rows.shape[0]]
+        m = self.mask[:rows.shape[0]]
+
+        if self.columns is None:
+            np.copyto(y, rows, casting = 'unsafe')
+        else:
+            np.take(rows, self.columns, axis = 1, out = y, mode = 'clip')
+
+        if self.clean:
+            np.isfinite(y, out = m)
+            np.logical_not(m, out = m)
+            np.copyto(y, 0.0, where = m)
+
+        if scale:
+            np.abs(y, out = y, where = self.abs_msk)
+            np.greater(y, 0.0, out = m)
+            np.logical_and(m, self.log_msk, out = m)
+            np.log10(y, out = y, where = m)
+            np.clip(y, self.lower, self.upper, out = y)
+            np.multiply(y, self.factor, out = y)
+            np.add(y, self.offset, out = y)
+
+        np.isnan(y, out = m)
+        np.copyto(y, 0.0, where = m)
+        np.clip(y, -self.limit, self.limit, out = y)
+
+        if self.out is None:
+            return y.astype(self.dtype)
+
+        out = self.out[:rows.shape[0]]
+        np.copyto(out, y, casting = 'same_kind')
+        return out
+
+class ObservationPipeline:
+    """
+    Observation, achieved goal and desired goal of a `GoalEnv`, computed in
+    one pass from rows of simulation results and goals, see `ColumnScaler`.
+    """
+    def __init__( self, ckt_id: str, constraints: dict
+                , result_ids: Iterable[str], obs_ids: Iterable[str]
+                , goal_ids: Iterable[str], num: int
+                , dtype: np.dtype = np.float64
+                , out: Tuple[np.ndarray, np.ndarray, np.ndarray] = None ):
+        """
+        Construct an observation pipeline.
+        Arguments:
+            - `ckt_id`:      Circuit ID.
+            - `constraints`: Constraints obtained from serafin.
+            - `result_ids`:  Columns of the simulation result rows.
+            - `obs_ids`:     Observed columns.
+            - `goal_ids`:    Goal columns, also the columns of goal rows.
+            - `num`:         Maximum number of rows.
+            - `dtype`:       Data type of the results.
+            - `out`:         Output buffers of observation, achieved and
+                             desired goal, see `ColumnScaler`.
+        """
+        out           = out or (None, None, None)
+        index         = { c: i for i,c in enumerate(result_ids) }
+        self.obs      = ColumnScaler( ckt_id, constraints, obs_ids, num
+                                    , np.array([ index[c] for c in obs_ids ], dtype = int)
+                                    , True, dtype, out[0] )
+        self.achieved = ColumnScaler( ckt_id, constraints, goal_ids, num
+                                    , np.array([ index[c] for c in goal_ids ], dtype = int)
+                                    , True, dtype, out[1] )
+        self.desired  = ColumnScaler( ckt_id, constraints, goal_ids, num
+                                    , None, False, dtype, out[2] )
+
+    def __call__( self, results: np.ndarray, goals: np.ndarray
+                , scale: bool = True
+                ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Returns `(observation, achieved_goal, desired_goal)` for the given
+        rows of `results` and `goals`.
+        """
+        return ( self.obs(results, scale)
+               , self.achieved(results, scale)
+               , self.desired(goals, scale) )
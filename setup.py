@@ -8,7 +8,8 @@ with open('README.md', 'r') as fh:
 with open('requirements.txt', 'r') as req:
     requirements = req.read().splitlines()
 
-scripts: [str] = [ f'carnival = {package_name}.__main__:carnival']
+scripts: [str] = [ f'carnival = {package_name}.__main__:carnival'
+                  , f'circus-worker = {package_name}.__main__:worker' ]
 
 setup( name                          = package_name
      , version                       = '2.0.0'
@@ -0,0 +1,128 @@
+""" Result Cache Test Suite """
+
+import numpy as np
+import pandas as pd
+
+from circus import seraf
+from circus.cache import ResultCache, SQLiteCache, TieredCache, CachedPool, \
+                         ApproximatePool, NeighbourIndex, approximated, \
+                         sizing_key, import_results, spec_path, load_spec, \
+                         store_spec
+
+from test_seraf import STAND_IN, _sizing
+
+def test_result_cache():
+    cache  = ResultCache(size = 2)
+    sizing = _sizing(3)
+    keys   = [ sizing_key(('sym', 'xh035'), sizing.iloc[[i]]) for i in range(3) ]
+    result = STAND_IN.evaluate(STAND_IN.make('', '', ''), sizing.iloc[[0]])
+
+    for key in keys:
+        cache.put(key, result)
+
+    assert len(cache) == 2 and cache.get(keys[0]) is None, \
+           'Least recently used result was not evicted.'
+    assert cache.get(keys[2]).equals(result), \
+           'Cached result does not match.'
+    assert cache.stats()['cache_hits'] == 1 and cache.stats()['cache_misses'] == 1, \
+           f'Unexpected cache statistics {cache.stats()}.'
+    assert keys[0] == sizing_key(('sym', 'xh035'), sizing.iloc[[0]] * (1.0 + 1.0e-9)), \
+           'Sizings differing only by noise must share a key.'
+
+def test_cached_pool():
+    ops    = seraf.make_ops('', '', '', 3, STAND_IN)
+    pool   = CachedPool( seraf.SessionPool(ops, STAND_IN), ResultCache(size = 8)
+                       , ('sym', 'xh035') )
+    sizing = _sizing(3)
+    first  = seraf.evaluate(pool, sizing)
+    _      = seraf.set_parameters(pool, 3 * [{ 'W': 9.0e-6 }])
+    second = seraf.evaluate(pool, sizing)
+
+    assert pool.stats()['simulations'] == 3 and pool.stats()['cache_hits'] == 3, \
+           f'Revisited sizings were simulated again {pool.stats()}.'
+    assert first.reset_index(drop = True).equals(second.reset_index(drop = True)), \
+           'Cached results differ from simulated results.'
+    assert np.allclose(seraf.current_sizing(pool)['W'].values, sizing['W'].values), \
+           'Sizing must be set on the session on a cache hit.'
+
+    projected = seraf.evaluate(pool, sizing, [ 'a_0' ])
+    assert list(projected.columns) == [ 'a_0' ] and \
+           pool.stats()['cache_hits'] == 6, \
+           'Complete cached results must serve projected evaluations.'
+    pool.close()
+
+def test_sqlite_cache(tmp_path):
+    path   = str(tmp_path / 'results.db')
+    sizing = _sizing(4)
+    op     = STAND_IN.make('', '', '')
+    result = pd.concat([ STAND_IN.evaluate(op, sizing.iloc[[i]]) for i in range(4) ]
+                      ).reset_index(drop = True)
+    prefix = ('sym', 'xh035', '')
+    keys   = [ sizing_key(prefix, sizing.iloc[[i]]) for i in range(4) ]
+
+    import_results(SQLiteCache(str(tmp_path / 'seed.db')), prefix, sizing, result)
+    cache  = SQLiteCache(path, size = 3 * result.shape[1] * 8)
+
+    assert cache.merge(str(tmp_path / 'seed.db')) == 4, \
+           'Bulk import from earlier store failed.'
+    _      = cache.get(keys[3])
+    cache.put(keys[0], result.iloc[[0]])
+    assert cache.get(keys[0]) is not None, \
+           'Queued result must be visible before it is written.'
+    cache.flush()
+    assert len(cache) == 2 and cache.get(keys[1]) is None and cache.get(keys[2]) is None, \
+           'Least recently used results were not evicted down to the headroom.'
+    assert cache.stats()['disk_bytes'] == 2 * result.shape[1] * 8, \
+           'Running total of the stored size is off.'
+    assert np.allclose(SQLiteCache(path).get(keys[0]).values, result.iloc[[0]].values), \
+           'Stored result is not visible to other connections.'
+
+    tiered = TieredCache(ResultCache(size = 8), cache)
+    assert tiered.get(keys[3]) is not None and tiered.caches[0].get(keys[3]) is not None, \
+           'Stored result was not promoted into memory.'
+
+def test_approximate_pool():
+    ops    = seraf.make_ops('', '', '', 2, STAND_IN)
+    pool   = ApproximatePool( seraf.SessionPool(ops, STAND_IN), NeighbourIndex(4)
+                            , 0.01 )
+    sizing = _sizing(2)
+    _      = seraf.evaluate(pool, sizing)
+
+    nearby = sizing.copy()
+    nearby['W'] = nearby['W'] * 1.005
+    futures = seraf.evaluate_async(pool, nearby)
+    results = seraf.gather(futures)
+
+    assert all(approximated(futures)) and pool.stats()['simulations'] == 2, \
+           'Nearby sizings were not approximated.'
+    assert np.allclose(results['W'].values, sizing['W'].values), \
+           'Approximation must be the result of the nearest sizing.'
+
+    distant = sizing.copy()
+    distant['W'] = distant['W'] * 1.05
+    futures = seraf.evaluate_async(pool, distant)
+    _       = seraf.gather(futures)
+
+    assert not any(approximated(futures)) and pool.stats()['simulations'] == 4, \
+           'Sizings outside of tolerance must be simulated.'
+    pool.close()
+
+def test_spec_cache(tmp_path, monkeypatch):
+    monkeypatch.setenv('CIRCUS_HOME', str(tmp_path))
+    netlist = tmp_path / 'sym.scs'
+    netlist.write_text('M1 (d g s b) nmos')
+    path    = spec_path('sym', 'xh035', '', '', str(netlist))
+    op      = STAND_IN.make('', '', '')
+    spec    = seraf.op_spec(op)
+    result  = STAND_IN.evaluate(op)
+
+    assert load_spec(path) is None, \
+           'Nothing should be cached yet.'
+    store_spec(path, spec, result)
+    cached, initial = load_spec(path)
+    assert cached == spec and np.allclose(initial.values, result.values), \
+           'Cached spec does not match.'
+
+    netlist.write_text('M1 (d g s b) pmos')
+    assert spec_path('sym', 'xh035', '', '', str(netlist)) != path, \
+           'Changing the netlist must invalidate the cached spec.'
@@ -0,0 +1,127 @@
+""" Environment Test Suite """
+
+import numpy as np
+import torch as pt
+
+from circus import seraf
+import circus.circus as ckt
+from test_seraf import STAND_IN
+
+def _make_env(monkeypatch, num: int = 4, **kwargs) -> ckt.CircusGeom:
+    def make_pool(backend, ckt_cfg, pdk_cfg, netlist, num, **_):
+        return seraf.SessionPool(seraf.make_ops('', '', '', num, STAND_IN), STAND_IN)
+    monkeypatch.setattr(ckt, 'make_pool', make_pool)
+    return ckt.CircusGeom( ckt_id = 'mil', pdk_id = 'xh035', num_envs = num
+                         , spec_cache = False, **kwargs )
+
+def _actions(env: ckt.CircusGeom, num: int) -> np.ndarray:
+    return np.random.uniform(-1.0, 1.0, (num, len(env.input_parameters)))
+
+def test_masked_reset(monkeypatch):
+    env    = _make_env(monkeypatch)
+    _      = env.reset()
+    sizing = env.sizing.copy()
+    sims   = env.pool.stats()['simulations']
+    obs    = env.reset(env_mask = [True, False, False, True])
+
+    assert env.pool.stats()['simulations'] - sims == 2, \
+           'Only masked environments must be simulated.'
+    assert np.allclose(env.sizing.iloc[[1,2]].values, sizing.iloc[[1,2]].values), \
+           'Environments that were not masked must keep their sizing.'
+    assert not np.allclose(env.sizing.iloc[[0,3]].values, sizing.iloc[[0,3]].values), \
+           'Masked environments were not reset.'
+    assert obs['observation'].shape == (4, len(env.obs_filter)), \
+           'Reset must return the observation of all environments.'
+
+    sizing = env.sizing.copy()
+    sims   = env.pool.stats()['simulations']
+    obs    = env.reset(env_mask = [False] * 4)
+
+    assert env.pool.stats()['simulations'] == sims and \
+           np.allclose(env.sizing.values, sizing.values), \
+           'No environment must be reset if none is masked.'
+    assert obs['observation'].shape == (4, len(env.obs_filter)), \
+           'Reset must return the observation of all environments.'
+    env.close()
+
+def test_step_async(monkeypatch):
+    env     = _make_env(monkeypatch, result_filter = [ 'W' ])
+    _       = env.reset()
+    actions = _actions(env, 4)
+
+    env.step_async(actions)
+    obs, reward, done, info = env.step_wait()
+
+    assert np.allclose( env.sizing[env.input_parameters].values
+                      , env.action_to_sizing(actions)[env.input_parameters].values ), \
+           'Sizing does not reflect the actions.'
+    assert np.allclose(env.last_obs['W'].values, env.sizing['W'].values), \
+           'Results do not belong to the sizing of the environment.'
+    assert obs['observation'].shape == (4, len(env.obs_filter)) and \
+           obs['desired_goal'].shape == (4, len(env.goal_filter)), \
+           'Observation has the wrong shape.'
+    assert reward.shape == (4,) and done.shape == (4,) and len(info) == 4, \
+           'Expected one reward, done and info per environment.'
+    env.close()
+
+def test_send_recv(monkeypatch):
+    env      = _make_env(monkeypatch, batch_size = 2)
+    _        = env.reset()
+    actions  = _actions(env, 2)
+    expected = dict(zip([3, 1], env.evaluate_batch(actions)[0]))
+
+    env.send(actions, [3, 1])
+    obs, reward, done, info, env_ids = env.recv()
+
+    assert sorted(env_ids.tolist()) == [1, 3], \
+           'Results of other environments than sent were received.'
+    assert [ i['env_id'] for i in info ] == env_ids.tolist(), \
+           'Info does not belong to the received environments.'
+    assert all( np.allclose( inf.get('terminal_obs', obs['observation'][k])
+                           , expected[i] )
+                for k,(i,inf) in enumerate(zip(env_ids, info)) ), \
+           'Received results do not belong to the sent actions.'
+    assert obs['observation'].shape == (2, len(env.obs_filter)) and \
+           reward.shape == (2,), \
+           'Expected results for `batch_size` environments.'
+    env.close()
+
+def test_info_mode(monkeypatch):
+    env  = _make_env(monkeypatch, info_mode = 'lite')
+    _    = env.reset()
+    info = env.step(_actions(env, 4))[3]
+
+    assert all(set(i.keys()) == { 'is_success', 'sim_timeout', 'approximate' }
+               for i in info), \
+           'Lite info must only hold the flags.'
+    assert env.info_keys['inputs'] == env.input_parameters, \
+           'Static keys must be available on the environment.'
+    env.close()
+
+def test_dtype(monkeypatch):
+    env    = _make_env(monkeypatch, dtype = np.float32)
+    _      = env.reset()
+    obs, reward, _, _ = env.step(_actions(env, 4))
+
+    assert all(o.dtype == np.float32 for o in obs.values()) and \
+           reward.dtype == np.float32, \
+           'Observations and rewards must be of the given dtype.'
+    assert all(s.dtype == np.float32 for s in env.observation_space.values()), \
+           'Observation spaces must be of the given dtype.'
+    assert env.obs_table.values.dtype == np.float64, \
+           'Raw results must be kept in double precision.'
+    env.close()
+
+def test_torch_return_type(monkeypatch):
+    env    = _make_env(monkeypatch, return_type = 'torch', dtype = np.float32)
+    first  = env.reset()
+    second, reward, done, _ = env.step(_actions(env, 4))
+
+    assert all(isinstance(o, pt.Tensor) for o in second.values()) and \
+           isinstance(reward, pt.Tensor) and isinstance(done, pt.Tensor), \
+           'Observations, rewards and dones must be tensors.'
+    assert all( np.shares_memory(first[k].numpy(), second[k].numpy()) and
+                np.shares_memory(second[k].numpy(), env.tensors[k].numpy())
+                for k in second.keys() ), \
+           'Tensors must be reused and share memory with the buffers.'
+    env.close()
@@ -0,0 +1,446 @@
+""" Session Pool Test Suite """
+
+import socket
+import threading
+from concurrent.futures import wait
+from multiprocessing import AuthenticationError
+import numpy as np
+import pandas as pd
+
+from circus import seraf
+
+GEOM = { 'L': 1.0e-6, 'W': 2.0e-6, 'M': 2 }
+
+class StandIn:
+    """ Stand-in for a serafin op amp, without simulator. """
+    def __init__(self, pdk_cfg: str, ckt_cfg: str, netlist: str):
+        self.parameters   = { 'vdd': 1.8 }
+        self.constraints  = { 'length': { 'min': 1.0e-7, 'max': 1.0e-5 }
+                            , 'width':  { 'min': 1.0e-7, 'max': 1.0e-4 } }
+        self.performances = { 'a_0': None, 'ugbw': None }
+        self.dcop_params  = { 'MND1:gm': None }
+        self.offs_params  = { 'MND1:voff': None }
+        self.geom_init    = dict(GEOM)
+        self.sizing       = dict(GEOM)
+        self.running      = True
+
+def stand_in_evaluate(op: StandIn, sizing: pd.DataFrame = None) -> pd.DataFrame:
+    if sizing is not None:
+        op.sizing = sizing.iloc[0].to_dict()
+    perf = { 'a_0': op.sizing['W'] / op.sizing['L'], 'ugbw': op.sizing['W']
+           , 'MND1:gm': 1.0, 'MND1:voff': 0.0 }
+    return pd.DataFrame({ k: [v] for k,v in (perf | op.sizing).items() })
+
+def stand_in_set_parameters(op: StandIn, sizing: dict[str, float]) -> bool:
+    op.sizing.update({ k: v for k,v in sizing.items() if k in op.sizing })
+    return True
+
+def stand_in_current_sizing(op: StandIn) -> pd.DataFrame:
+    return pd.DataFrame({ k: [v] for k,v in op.sizing.items() })
+
+def stand_in_random_sizing(op: StandIn) -> pd.DataFrame:
+    return pd.DataFrame({ k: [v * np.random.uniform(0.5, 2.0)]
+                          for k,v in GEOM.items() })
+
+def stand_in_stop(op: StandIn) -> bool:
+    op.running = False
+    return True
+
+def stand_in_alive(op: StandIn) -> bool:
+    return op.running
+
+def stand_in_rss(op: StandIn) -> int:
+    return 0
+
+STAND_IN = seraf.Simulator( make           = StandIn
+                          , evaluate       = stand_in_evaluate
+                          , set_parameters = stand_in_set_parameters
+                          , current_sizing = stand_in_current_sizing
+                          , random_sizing  = stand_in_random_sizing
+                          , stop           = stand_in_stop
+                          , alive          = stand_in_alive
+                          , rss            = stand_in_rss
+                          , )
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('localhost', 0))
+        return sock.getsockname()[1]
+
+AUTHKEY = b'stand-in'
+
+def _start_worker(num: int) -> str:
+    port    = _free_port()
+    address = ('localhost', port)
+    threading.Thread( target = seraf.serve
+                    , args   = (address, '', '', '', num)
+                    , kwargs = { 'simulator': STAND_IN, 'authkey': AUTHKEY }
+                    , daemon = True ).start()
+    for _ in range(100):
+        try:
+            with socket.create_connection(address):
+                break
+        except OSError:
+            threading.Event().wait(0.05)
+    return f'localhost:{port}'
+
+def _sizing(num: int) -> pd.DataFrame:
+    return pd.DataFrame({ 'L': np.full(num, 1.0e-6)
+                        , 'W': np.arange(1, num + 1) * 1.0e-6
+                        , 'M': np.full(num, 2) })
+
+def _test_pool(pool):
+    num     = len(pool)
+    sizing  = _sizing(num)
+    results = seraf.evaluate(pool, sizing)
+
+    assert len(results) == num, \
+           f'Expected {num} results, got {len(results)}.'
+    assert np.allclose(results['W'].values, sizing['W'].values), \
+           'Results are not in env order.'
+    assert np.allclose(results['a_0'].values, sizing['W'] / sizing['L']), \
+           'Results do not belong to the given sizing.'
+    assert seraf.set_parameters(pool, num * [{ 'W': 3.0e-6 }]), \
+           'Setting parameters failed.'
+    assert np.allclose(seraf.current_sizing(pool)['W'].values, 3.0e-6), \
+           'Parameters were not set on all sessions.'
+    assert seraf.random_sizing(pool).shape == (num, len(GEOM)), \
+           'Random sizing has the wrong shape.'
+    assert sorted(pool.spec.geom_init.keys()) == sorted(GEOM.keys()), \
+           'Pool spec does not match sessions.'
+
+def test_session_pool():
+    pool = seraf.SessionPool(seraf.make_ops('', '', '', 3, STAND_IN), STAND_IN)
+    _test_pool(pool)
+    pool.close()
+
+def test_remote_pool():
+    workers = [ _start_worker(2), _start_worker(3) ]
+    pool    = seraf.RemotePool(workers, 4, AUTHKEY)
+    _test_pool(pool)
+    pool.close()
+
+    pool    = seraf.RemotePool(workers, 5, AUTHKEY)
+    _test_pool(pool)
+
+    try:
+        seraf.RemotePool(workers[:1], 2, AUTHKEY)
+        assert False, 'A busy worker must refuse further clients.'
+    except ConnectionRefusedError:
+        pass
+    pool.close()
+
+def test_remote_authkey(monkeypatch):
+    monkeypatch.setattr(seraf, 'AUTHKEY', None)
+    for host in [ '0.0.0.0', 'localhost' ]:
+        try:
+            seraf.serve((host, _free_port()), '', '', '', 1, simulator = STAND_IN)
+            assert False, 'Workers must not listen without a shared secret.'
+        except ValueError:
+            pass
+    try:
+        seraf.RemotePool([_start_worker(1)], 1)
+        assert False, 'Clients must not connect without a shared secret.'
+    except ValueError:
+        pass
+    try:
+        seraf.RemotePool([_start_worker(1)], 1, b'guess')
+        assert False, 'Workers must refuse clients with the wrong secret.'
+    except AuthenticationError:
+        pass
+
+def test_process_pool():
+    pool = seraf.ProcessPool('', '', '', 3, num_shards = 2, simulator = STAND_IN)
+    assert len(pool.procs) == 2, \
+           'Sessions were not sharded across worker processes.'
+    _test_pool(pool)
+    pool.close()
+    assert not any(proc.is_alive() for proc in pool.procs), \
+           'Worker processes were not shut down.'
+
+def stuck_evaluate(op: StandIn, sizing: pd.DataFrame = None) -> pd.DataFrame:
+    threading.Event().wait(10.0)
+    return stand_in_evaluate(op, sizing)
+
+def test_lost_host():
+    simulator = STAND_IN._replace(evaluate = stuck_evaluate)
+    pool      = seraf.ProcessPool('', '', '', 2, num_shards = 1, simulator = simulator)
+    futures   = seraf.evaluate_async(pool, _sizing(2))
+
+    pool.procs[0].kill()
+    done, _   = wait(futures, timeout = 5.0)
+
+    assert len(done) == 2 and \
+           all(isinstance(f.exception(), ConnectionError) for f in futures), \
+           'Requests in flight must fail when their host is lost.'
+    assert isinstance(pool.submit(0, 'current_sizing').exception(0.0), ConnectionError), \
+           'Requests to a lost host must fail right away.'
+    pool.close()
+
+SLOW = []
+
+def slow_evaluate(op: StandIn, sizing: pd.DataFrame = None) -> pd.DataFrame:
+    if op in SLOW:
+        threading.Event().wait(1.0)
+    return stand_in_evaluate(op, sizing)
+
+def test_speculative_pool():
+    simulator = STAND_IN._replace(evaluate = slow_evaluate)
+    ops       = seraf.make_ops('', '', '', 4, simulator)
+    pool      = seraf.SpeculativePool(seraf.SessionPool(ops, simulator), 0.2)
+    sizing    = _sizing(4)
+
+    SLOW.append(ops[1])
+    futures   = seraf.evaluate_async(pool, sizing)
+    results   = seraf.gather(futures)
+
+    assert np.allclose(results['W'].values, sizing['W'].values), \
+           'Straggler was not re-executed on an idle session.'
+    assert not any(seraf.timed_out(futures)), \
+           'Re-executed straggler must not be flagged.'
+
+    threading.Event().wait(1.0)
+    SLOW.extend(ops)
+    futures   = seraf.evaluate_async(pool, sizing)
+    results   = seraf.gather(futures)
+
+    assert all(seraf.timed_out(futures)), \
+           'Evaluations missing both deadlines must be flagged.'
+    assert results['W'].isna().all(), \
+           'Timed out evaluations must be marked with NaN.'
+
+    SLOW.clear()
+    pool.watchdog.stop()
+
+HUNG = {}
+
+def hanging_evaluate(op: StandIn, sizing: pd.DataFrame = None) -> pd.DataFrame:
+    if op in HUNG:
+        HUNG[op].wait()
+        raise RuntimeError('Session was stopped.')
+    return stand_in_evaluate(op, sizing)
+
+def hanging_stop(op: StandIn) -> bool:
+    if op in HUNG:
+        HUNG.pop(op).set()
+    return stand_in_stop(op)
+
+def test_hung_session():
+    simulator = STAND_IN._replace(evaluate = hanging_evaluate, stop = hanging_stop)
+    ops       = seraf.make_ops('', '', '', 2, simulator)
+    pool      = seraf.SpeculativePool( seraf.SessionPool(ops, simulator, ('', '', ''))
+                                     , 0.1 )
+    sizing    = _sizing(2)
+    hung      = list(ops)
+
+    HUNG.update({ op: threading.Event() for op in hung })
+    futures   = seraf.evaluate_async(pool, sizing)
+    queued    = seraf.evaluate_async(pool, sizing)
+    _         = seraf.gather(futures)
+
+    assert all(seraf.timed_out(futures)), \
+           'Hung evaluations must be flagged.'
+
+    results   = seraf.evaluate(pool, sizing)
+
+    assert np.allclose(results['W'].values, sizing['W'].values), \
+           'Evaluation after a hung one did not finish.'
+    assert all(f.done() for f in queued), \
+           'Evaluations queued behind a hung one were not moved.'
+    assert not HUNG and all(o not in pool.pool.ops for o in hung), \
+           'Hung sessions were not stopped and re-created.'
+
+    closer    = threading.Thread(target = pool.close)
+    closer.start()
+    closer.join(5.0)
+
+    assert not closer.is_alive(), \
+           'Pool with killed sessions did not close.'
+
+def test_watchdog():
+    watchdog = seraf.Watchdog()
+    fired    = threading.Event()
+
+    def fail():
+        raise RuntimeError('Callback failed.')
+
+    watchdog.schedule(0.0, fail)
+    watchdog.schedule(0.01, fired.set)
+
+    assert fired.wait(5.0) and watchdog.thread.is_alive(), \
+           'Watchdog stopped after a callback raised.'
+    watchdog.stop()
+
+def test_respawn():
+    ops    = seraf.make_ops('', '', '', 3, STAND_IN)
+    pool   = seraf.SessionPool(ops, STAND_IN, ('', '', ''))
+    sizing = _sizing(3)
+    _      = seraf.evaluate(pool, sizing)
+    live   = [ ops[0], ops[2] ]
+    dead   = ops[1]
+    dead.running = False
+
+    assert np.allclose(seraf.current_sizing(pool)['W'].values, sizing['W'].values), \
+           'Sizing was not replayed on respawned session.'
+    assert pool.respawns == 1 and pool.ops[1] is not dead, \
+           'Dead session was not respawned.'
+    assert pool.ops[0] is live[0] and pool.ops[2] is live[1], \
+           'Live sessions must not be touched.'
+    pool.close()
+
+def test_recycle():
+    ops    = seraf.make_ops('', '', '', 2, STAND_IN)
+    pool   = seraf.SessionPool( ops, STAND_IN, ('', '', '')
+                              , recycle_after = 3 )
+    worn   = list(ops)
+    sizing = _sizing(2)
+    for _ in range(3):
+        _  = seraf.evaluate(pool, sizing)
+    for _ in range(100):
+        if pool.recycles == 2:
+            break
+        threading.Event().wait(0.05)
+
+    assert pool.stats() == { 'simulations': 6, 'respawns': 0, 'recycles': 2 }, \
+           f'Unexpected lifecycle counters {pool.stats()}.'
+    assert all(not w.running for w in worn), \
+           'Recycled sessions were not stopped.'
+    assert np.allclose(seraf.current_sizing(pool)['W'].values, sizing['W'].values), \
+           'Sizing was not replayed on recycled session.'
+    pool.close()
+
+def test_multiplex_pool():
+    ops  = seraf.make_ops('', '', '', 2, STAND_IN)
+    pool = seraf.MultiplexPool(seraf.SessionPool(ops, STAND_IN), 5)
+    _test_pool(pool)
+
+    widths = [ { 'W': w * 1.0e-6 } for w in range(1, 6) ]
+    assert seraf.set_parameters(pool, widths), \
+           'Setting parameters failed.'
+    assert np.allclose( seraf.current_sizing(pool)['W'].values
+                      , [ w['W'] for w in widths ] ), \
+           'Parameters of environments sharing a session got mixed up.'
+    assert len(pool) == 5 and len(pool.pool) == 2, \
+           'Environments must be multiplexed over less sessions.'
+
+    seraf.stop_sessions(pool, range(4))
+    assert all(op.running for op in ops), \
+           'Sessions must keep running while environments use them.'
+    seraf.stop_sessions(pool, [4])
+    assert not any(op.running for op in ops), \
+           'Sessions were not stopped with the last environment.'
+    pool.close()
+
+def test_projection():
+    pool    = seraf.SessionPool(seraf.make_ops('', '', '', 3, STAND_IN), STAND_IN)
+    remote  = seraf.RemotePool([_start_worker(3)], 3, AUTHKEY)
+    sizing  = _sizing(3)
+
+    for p in [pool, remote]:
+        results = seraf.evaluate(p, sizing, [ 'ugbw', 'a_0' ])
+        assert list(results.columns) == [ 'ugbw', 'a_0' ], \
+               'Results were not projected to the requested columns.'
+        assert np.allclose(results['ugbw'].values, sizing['W'].values), \
+               'Projected results do not belong to the given sizing.'
+
+    batch = seraf.evaluate_batch(pool, _sizing(5), [ 'a_0', 'vn_1Hz' ])
+    assert batch.shape == (5, 2) and batch['vn_1Hz'].isna().all(), \
+           'Unknown columns must be NaN.'
+    pool.close()
+    remote.close()
+
+def test_evaluate_batch():
+    pool    = seraf.SessionPool(seraf.make_ops('', '', '', 2, STAND_IN), STAND_IN)
+    sizing  = _sizing(7)
+    results = seraf.evaluate_batch(pool, sizing)
+
+    assert len(results) == 7, \
+           f'Expected 7 results, got {len(results)}.'
+    assert np.allclose(results['W'].values, sizing['W'].values), \
+           'Results are not in the order of the sizings.'
+    pool.close()
+
+def test_evaluate_duplicates():
+    ops     = seraf.make_ops('', '', '', 4, STAND_IN)
+    pool    = seraf.SessionPool(ops, STAND_IN, ('', '', ''))
+    sizing  = _sizing(4)
+    sizing.iloc[2] = sizing.iloc[0]
+    sizing.iloc[3] = sizing.iloc[0]
+    results = seraf.evaluate(pool, sizing)
+
+    assert pool.stats()['simulations'] == 2, \
+           'Identical sizings were simulated more than once.'
+    assert np.allclose(results['W'].values, sizing['W'].values), \
+           'Results were not fanned out to all sessions.'
+    assert np.allclose(seraf.current_sizing(pool)['W'].values, sizing['W'].values), \
+           'Sizing was not set on sessions with duplicate sizings.'
+    pool.close()
+
+def test_reset_buffer():
+    ops    = seraf.make_ops('', '', '', 2, STAND_IN)
+    pool   = seraf.SessionPool(ops, STAND_IN)
+    buffer = seraf.ResetBuffer(pool, 3)
+    for _ in range(100):
+        if len(buffer) == 3:
+            break
+        threading.Event().wait(0.05)
+    buffer.close()
+    states = buffer.take(5)
+
+    assert len(states) == 3, \
+           f'Expected 3 precomputed states, got {len(states)}.'
+    assert all( np.isclose(r['W'].values[0], s['W'].values[0])
+                for s,r in states ), \
+           'Precomputed results do not belong to their sizing.'
+    pool.close()
+
+def test_lazy_pool():
+    started = threading.Event()
+
+    def make() -> seraf.SessionPool:
+        started.wait(5.0)
+        return seraf.SessionPool(seraf.make_ops('', '', '', 3, STAND_IN), STAND_IN)
+
+    spec    = seraf.op_spec(StandIn('', '', ''))
+    pool    = seraf.LazyPool(make, spec, 3)
+    sizing  = _sizing(3)
+    futures = seraf.evaluate_async(pool, sizing)
+
+    assert len(pool) == 3 and pool.spec == spec and not any(f.done() for f in futures), \
+           'Lazy pool must be usable before sessions are up.'
+    started.set()
+    assert np.allclose(seraf.gather(futures)['W'].values, sizing['W'].values), \
+           'Commands queued before sessions were up got lost.'
+    _test_pool(pool)
+    pool.close()
+
+def test_session_registry():
+    registry = seraf.SessionRegistry()
+    config   = ('', '', '')
+    train    = registry.lease(*config, 3, simulator = STAND_IN)
+    evaluate = registry.lease(*config, 4, simulator = STAND_IN)
+    shared   = train.pool
+
+    assert evaluate.pool is shared and len(shared) == 4 and registry.leases(config) == 2, \
+           'Leases for the same configuration must share sessions.'
+    _test_pool(train)
+    _test_pool(evaluate)
+
+    seraf.set_parameters(train, 3 * [{ 'W': 5.0e-6 }])
+    seraf.set_parameters(evaluate, 4 * [{ 'W': 7.0e-6 }])
+    assert np.allclose(seraf.current_sizing(train)['W'].values, 5.0e-6), \
+           'Parameters of leases sharing sessions got mixed up.'
+
+    seraf.stop_sessions(train, range(3))
+    train.close()
+    evaluate.close()
+    assert registry.leases(config) == 0 and all(op.running for op in shared.ops), \
+           'Returning leases must not stop sessions.'
+
+    again    = registry.lease(*config, 2, simulator = STAND_IN)
+    assert again.pool is shared, \
+           'Sessions were not reused by a later lease.'
+    again.close()
+    registry.stop()
+    assert not any(op.running for op in shared.ops), \
+           'Sessions without leases were not stopped.'
@@ -0,0 +1,80 @@
+""" Utility Test Suite """
+
+import numpy as np
+import pandas as pd
+
+from circus.util import StateTable, ObservationPipeline, filter_results, \
+                        performance_scaler
+
+def test_state_table_rows():
+    table = StateTable(['a', 'b', 'c'], 2)
+    frame = pd.DataFrame({ 'c': [3.0], 'x': [9.0], 'a': [1.0] })
+
+    assert np.allclose(table.rows(frame), [[1.0, np.nan, 3.0]], equal_nan = True), \
+           'Rows must be in column order of the table, missing columns NaN.'
+    assert np.isnan(table.values).all() and len(table) == 2, \
+           'New table must be filled with NaNs.'
+
+def test_state_table_update():
+    table  = StateTable(['a', 'b'], 4)
+    values = np.arange(8, dtype = float).reshape(4, 2)
+
+    table.update(slice(None), values)
+    before = table.frame
+    table.update(np.array([True, False, False, True]), np.zeros((2, 2)))
+
+    assert np.allclose(table.values[[0,3]], 0.0) and \
+           np.allclose(table.values[[1,2]], values[[1,2]]), \
+           'Only masked rows must be overwritten.'
+    assert np.allclose(before.values, values), \
+           'Frames must be copies of the table.'
+    assert table.frame is not before and np.allclose(table.frame.values, table.values), \
+           'Frame was not rebuilt after an update.'
+    assert table.frame is table.frame, \
+           'Frame must be built once per update.'
+
+    frames = [ pd.DataFrame({ 'b': [5.0], 'a': [6.0] })
+             , pd.DataFrame({ 'a': [7.0] }) ]
+    table.update_frames([2, 0], frames)
+
+    assert np.allclose(table.values[2], [6.0, 5.0]) and table.values[0,0] == 7.0 \
+           and np.isnan(table.values[0,1]), \
+           'Frames were not written to the given rows in column order.'
+    assert list(table.frame.columns) == ['a', 'b'], \
+           'Column order of the frame changed.'
+
+    table.update_frames([], [])
+    assert np.allclose(table.values[[1,3]], [values[1], [0.0, 0.0]]), \
+           'Updating no rows must not change the table.'
+
+def test_observation_pipeline():
+    constraints = { 'vdd': 1.8 }
+    results_ids = [ 'ugbw', 'W', 'voff_syst', 'a_0', 'MND1:gm', 'area', 'pm', 'L' ]
+    obs_ids     = sorted([ 'a_0', 'area', 'MND1:gm', 'pm', 'ugbw', 'voff_syst' ])
+    goal_ids    = [ 'ugbw', 'a_0', 'pm' ]
+    num         = 6
+    pipeline    = ObservationPipeline( 'mil', constraints, results_ids, obs_ids
+                                     , goal_ids, num )
+    obs_scaler  = performance_scaler('mil', constraints, obs_ids)[0]
+    goal_scaler = performance_scaler('mil', constraints, goal_ids)[0]
+
+    for _ in range(10):
+        values       = 10.0 ** np.random.uniform(-8.0, 8.0, (num, len(results_ids)))
+        values      *= np.random.choice([-1.0, 1.0], values.shape)
+        values[1]    = np.nan
+        values[3,2]  = np.inf
+        results      = pd.DataFrame(values, columns = results_ids)
+        goals        = 10.0 ** np.random.uniform(-2.0, 8.0, (num, len(goal_ids)))
+
+        for scale in [True, False]:
+            obs, achieved, desired = pipeline(values, goals, scale)
+
+            state    = filter_results(obs_ids, results).values
+            reached  = filter_results(goal_ids, results).values
+            expected = [ np.nan_to_num(obs_scaler(state) if scale else state)
+                       , np.nan_to_num(goal_scaler(reached) if scale else reached)
+                       , np.nan_to_num(goal_scaler(goals) if scale else goals) ]
+
+            assert all( np.allclose(a, e) for a,e in
+                        zip([obs, achieved, desired], expected) ), \
+                   'Pipeline differs from filtering and scaling results.'